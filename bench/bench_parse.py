@@ -0,0 +1,80 @@
+# bench/bench_parse.py
+"""
+Микробенчмарк разбора ответа /fapi/v1/klines: прежний путь (json + DataFrame
+на 12 колонок, срез до 6, pd.to_datetime и astype(float)) против
+monitor.parser (orjson, если есть, + массив CANDLE_DTYPE) — мкс на ответ.
+
+    python bench/bench_parse.py --candles 200 --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.fake_binance import FakeBinance
+from monitor import parser as kline_parser
+from monitor.storage import ohlcv_view
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume',
+           'number_of_trades', 'taker_buy_base', 'taker_buy_quote', 'ignore']
+
+
+def pandas_path(raw):
+    """Разбор, как он был в fetch_ohlcv_binance/fetch_ohlcv_chart."""
+    df = pd.DataFrame(json.loads(raw), columns=COLUMNS)
+    df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
+    return df
+
+
+def listcomp_path(raw):
+    data = json.loads(raw)
+    ts = np.array([row[0] for row in data], dtype=np.int64)
+    ohlcv = np.array([row[1:6] for row in data], dtype=np.float64)
+    return ts, ohlcv
+
+
+def parser_path(raw):
+    rows = kline_parser.parse_klines(kline_parser.loads(raw))
+    return rows['timestamp'], ohlcv_view(rows)
+
+
+def measure(fn, raw, repeat):
+    fn(raw)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(raw)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--candles', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    raw = json.dumps(FakeBinance(1).kline_rows('FAKE0USDT', '1m', args.candles)).encode()
+    ts, ohlcv = parser_path(raw)
+    df = pandas_path(raw)
+    assert np.array_equal(ts, df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64))
+    assert np.array_equal(ohlcv, df[['open', 'high', 'low', 'close', 'volume']].to_numpy())
+
+    decoder = 'orjson' if kline_parser.orjson is not None else 'json'
+    print(f"{args.candles} свечей ({len(raw) / 1024:.1f} KB), {args.repeat} повторов, декодер {decoder}")
+    baseline = None
+    for name, fn in [('pandas (было)', pandas_path), ('json + list', listcomp_path), ('parser', parser_path)]:
+        us = measure(fn, raw, args.repeat if fn is not pandas_path else max(1, args.repeat // 5))
+        baseline = baseline or us
+        print(f"{name:<16}{us:>10.1f} мкс{baseline / us:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# bench/bench_render.py
+"""
+Бенчмарк рендера графиков: мс на график и пиковый RSS для mplfinance
+(monitor.charts.create_chart) и быстрого шаблона (monitor.fast_chart).
+Каждый рендерер запускается в отдельном процессе, чтобы пиковый RSS не смешивался.
+
+    python bench/bench_render.py --charts 50 --dpi 120 --format png
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def synthetic_candles(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.random(n) * 0.5
+    low = np.minimum(open_, close) - rng.random(n) * 0.5
+    volume = rng.random(n) * 1000
+    ts = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 60_000
+    return ts, np.column_stack([open_, high, low, close, volume])
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(renderer, charts, dpi, fmt):
+    import matplotlib
+    matplotlib.use('Agg')
+    from monitor.render_pool import render_png
+
+    frames = [synthetic_candles(seed=i) for i in range(charts)]
+    # Первый график прогревает импорты/шаблон и в замер не входит
+    render_png('WARMUP', '1m', *frames[0], renderer=renderer, dpi=dpi, fmt=fmt)
+    rss_before = peak_rss_mb()
+
+    timings, sizes = [], []
+    for i, (ts, ohlcv) in enumerate(frames):
+        start = time.perf_counter()
+        image = render_png(f'SYM{i}USDT', '1m', ts, ohlcv, renderer=renderer, dpi=dpi, fmt=fmt)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(image or b''))
+
+    print(json.dumps({
+        'renderer': renderer,
+        'ms_mean': float(np.mean(timings)),
+        'ms_p50': float(np.percentile(timings, 50)),
+        'ms_p99': float(np.percentile(timings, 99)),
+        'kb_mean': float(np.mean(sizes)) / 1024,
+        'rss_warm_mb': rss_before,
+        'rss_peak_mb': peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--charts', type=int, default=30)
+    parser.add_argument('--dpi', type=int, default=120)
+    parser.add_argument('--format', default='png', choices=['png', 'webp'])
+    parser.add_argument('--renderers', default='mplfinance,fast')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.charts, args.dpi, args.format)
+        return
+
+    print(f"{args.charts} графиков по 200 свечей, dpi={args.dpi}, format={args.format}")
+    print(f"{'renderer':<12}{'ms/chart':>10}{'p50':>8}{'p99':>8}{'KB':>8}{'RSS warm':>10}{'RSS peak':>10}")
+    for renderer in args.renderers.split(','):
+        out = subprocess.run(
+            [sys.executable, __file__, '--worker', renderer, '--charts', str(args.charts),
+             '--dpi', str(args.dpi), '--format', args.format],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['renderer']:<12}{r['ms_mean']:>10.1f}{r['ms_p50']:>8.1f}{r['ms_p99']:>8.1f}"
+              f"{r['kb_mean']:>8.0f}{r['rss_warm_mb']:>9.0f}M{r['rss_peak_mb']:>9.0f}M")
+
+
+if __name__ == '__main__':
+    main()
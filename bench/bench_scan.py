@@ -0,0 +1,282 @@
+# bench/bench_scan.py
+"""
+Сквозной бенчмарк цикла сканирования bot.run_monitor против локального
+фейкового Binance FAPI (bench/fake_binance.py, отдельный процесс) с заглушкой Telegram.
+По каждому циклу: время цикла, запросы/с, ответы 429/5xx и пиковый RSS;
+по стадиям fetch / analyze / render / send: число вызовов, p50/p99 на вызов,
+длительность стадии и CPU (для render — вместе с процессами пула).
+Первый цикл холодный (полная история), остальные — тёплые (догрузка хвоста).
+Каждое число символов прогоняется в отдельном процессе, чтобы пиковый RSS не смешивался.
+С --scan-workers N скан идёт в N процессах-шардах (monitor.shards): fetch/analyze и
+запросы считаются внутри шардов, вместо них печатается сводка по шардам.
+
+    python bench/bench_scan.py --symbols 300,1000,3000 --latency 30 --jitter 10 --cycles 3
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ['fetch', 'analyze', 'render', 'send']
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def children_cpu(pids):
+    """CPU-время (с) процессов пула рендера по /proc; 0, если /proc недоступен."""
+    total = 0.0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except (OSError, IndexError, ValueError):
+            pass
+    return total
+
+
+class Stage:
+    """Замеры одной стадии: длительности вызовов и окно [первый старт, последний финиш]."""
+
+    def __init__(self, name, cpu_extra=None):
+        self.name = name
+        self.cpu_extra = cpu_extra or (lambda: 0.0)
+        self.reset()
+
+    def reset(self):
+        self.calls = []
+        self.first = self.last = None
+        self.cpu_first = self.cpu_last = None
+
+    def begin(self):
+        if self.first is None:
+            self.first = time.perf_counter()
+            self.cpu_first = time.process_time() + self.cpu_extra()
+        return time.perf_counter()
+
+    def end(self, started):
+        self.last = time.perf_counter()
+        self.cpu_last = time.process_time() + self.cpu_extra()
+        self.calls.append(self.last - started)
+
+    def wrap(self, fn):
+        if asyncio.iscoroutinefunction(fn):
+            async def timed(*args, **kwargs):
+                started = self.begin()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.end(started)
+        else:
+            def timed(*args, **kwargs):
+                started = self.begin()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.end(started)
+        return timed
+
+    def report(self):
+        if not self.calls:
+            return f"  {self.name:<8}{'—':>7}"
+        ms = np.array(self.calls) * 1000
+        return (f"  {self.name:<8}{len(ms):>7}{np.percentile(ms, 50):>9.1f}{np.percentile(ms, 99):>9.1f}"
+                f"{(self.last - self.first) * 1000:>10.0f}{(self.cpu_last - self.cpu_first) * 1000:>10.0f}")
+
+
+class FakeBot:
+    """Заглушка telegram.Bot: только имитирует задержку Bot API."""
+
+    def __init__(self, stage, latency):
+        self.stage = stage
+        self.latency = latency
+
+    async def _call(self):
+        started = self.stage.begin()
+        await asyncio.sleep(self.latency)
+        self.stage.end(started)
+
+    async def send_photo(self, **kwargs):
+        await self._call()
+
+    async def send_message(self, **kwargs):
+        await self._call()
+
+
+def start_server(args, symbols, port):
+    cmd = [sys.executable, os.path.join(ROOT, 'bench', 'fake_binance.py'), '--port', str(port),
+           '--symbols', str(symbols), '--latency', str(args.latency), '--jitter', str(args.jitter),
+           '--error-rate', str(args.error_rate), '--rate-limit-rate', str(args.rate_limit_rate)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, cwd=ROOT)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(('127.0.0.1', port), timeout=0.2):
+            return proc
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("fake_binance не запустился")
+
+
+async def bench(args, symbols):
+    import bot
+    from monitor import fetcher
+    from monitor.analyzer import analyze_batch
+    from monitor.client import client
+    from monitor.indicators import engine
+    from monitor.logger import set_level
+    from monitor import scanner
+
+    port = free_port()
+    server = start_server(args, symbols, port)
+    fetcher.BINANCE_FAPI = f"http://127.0.0.1:{port}/fapi/v1"
+
+    set_level(args.log_level)
+    # Конфиг только в памяти: config.json не перезаписывается. Хранилище свечей выключено,
+    # как и в однопроцессном режиме: шарды не пишут FAKE*.bin в настоящий data_dir
+    bot.config.update({
+        'timeframe': args.timeframe, 'volume_filter': 0, 'chat_id': 'bench',
+        'price_change_filter': True, 'price_change_threshold': args.threshold,
+        'candle_store': False,
+    })
+    bot.render_pool.renderer = args.renderer
+    bot.render_pool.workers = args.render_workers
+    bot.dispatcher.cooldown = 0
+    bot.dispatcher.chat_interval = 0
+    bot.dispatcher.global_interval = 1.0 / args.telegram_rate
+
+    render_pids = lambda: list((bot.render_pool._executor and bot.render_pool._executor._processes) or ())
+    stages = {
+        'fetch': Stage('fetch'),
+        'analyze': Stage('analyze'),
+        'render': Stage('render', cpu_extra=lambda: children_cpu(render_pids())),
+        'send': Stage('send'),
+    }
+    scanner.update_candles = bot.update_candles = stages['fetch'].wrap(fetcher.update_candles)
+    bot.get_ticker_stats = stages['fetch'].wrap(fetcher.get_ticker_stats)
+    scanner.analyze_batch = stages['analyze'].wrap(analyze_batch)
+    engine.update = stages['analyze'].wrap(engine.update)
+    bot.render_pool.render = stages['render'].wrap(bot.render_pool.render)
+    bot.dispatcher.bot = FakeBot(stages['send'], args.telegram_latency)
+
+    statuses = []
+    client.observers.append(lambda status, headers: statuses.append(status))
+    submitted = 0
+    submit = bot.dispatcher.submit
+
+    def counted_submit(*a, **kw):
+        nonlocal submitted
+        submitted += 1
+        return submit(*a, **kw)
+
+    bot.dispatcher.submit = counted_submit
+
+    await client.start()
+    bot.render_pool.start()
+    bot.dispatcher.start()
+    bot.config['scan_workers'] = args.scan_workers
+    bot.start_coordinator()
+    # Процессы пула прогреваются до первого цикла
+    await asyncio.sleep(args.render_warmup)
+
+    print(f"\n=== {symbols} символов, tf={args.timeframe}, latency={args.latency}±{args.jitter} мс, "
+          f"errors={args.error_rate}, 429={args.rate_limit_rate}, renderer={args.renderer} ===")
+    try:
+        for cycle in range(args.cycles):
+            for stage in stages.values():
+                stage.reset()
+            statuses.clear()
+            sent_before = bot.dispatcher.sent + bot.dispatcher.dropped
+            submitted = 0
+            cpu_before = time.process_time()
+
+            # Тёплые циклы обычно идут внутри той же свечи: без сброса бот пропустил бы
+            # уже проанализированный бар, и analyze/render/send не попали бы в замер
+            bot.analyzed_bars.clear()
+            started = time.perf_counter()
+            await bot.run_monitor()
+            scan = time.perf_counter() - started
+            # Графики рендерятся и ставятся в очередь в фоне, уже после цикла
+            await asyncio.gather(*bot.delivery_tasks)
+            # Цикл завершён, когда Telegram-очередь дослана
+            deadline = time.monotonic() + args.send_timeout
+            while (bot.dispatcher.sent + bot.dispatcher.dropped - sent_before < submitted
+                   and time.monotonic() < deadline):
+                await asyncio.sleep(0.01)
+            total = time.perf_counter() - started
+
+            fetch = stages['fetch']
+            fetch_window = (fetch.last - fetch.first) if fetch.calls else 0
+            codes = np.array(statuses or [0])
+            print(f"цикл {cycle + 1} ({'холодный' if cycle == 0 else 'тёплый'}): "
+                  f"скан {scan:.2f}с, с отправкой {total:.2f}с, CPU {time.process_time() - cpu_before:.2f}с, "
+                  f"сигналов {submitted}, лимит {bot.limiter.limit}, вес {bot.limiter.used_weight}")
+            print(f"  запросов {len(statuses)} ({len(statuses) / fetch_window if fetch_window else 0:.0f}/с), "
+                  f"429: {int((codes == 429).sum())}, 5xx: {int((codes >= 500).sum())}, "
+                  f"RSS peak {peak_rss_mb():.0f}M")
+            print(f"  {'stage':<8}{'calls':>7}{'p50 ms':>9}{'p99 ms':>9}{'wall ms':>10}{'CPU ms':>10}")
+            for name in STAGES:
+                print(stages[name].report())
+            if bot.coordinator is not None:
+                print('  ' + bot.coordinator.summary().replace('\n', '\n  '))
+            if cycle + 1 < args.cycles and args.pause:
+                await asyncio.sleep(args.pause)
+    finally:
+        await bot.dispatcher.stop(timeout=0)
+        await bot.stop_coordinator()
+        await client.close()
+        bot.render_pool.close()
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', default='300', help='через запятую, например 300,1000,3000')
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--pause', type=float, default=0, help='пауза между циклами, с')
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--threshold', type=float, default=1.0, help='price_change_threshold, %%')
+    parser.add_argument('--latency', type=float, default=20, help='задержка FAPI, мс')
+    parser.add_argument('--jitter', type=float, default=5, help='мс')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0)
+    parser.add_argument('--renderer', default='fast', choices=['fast', 'mplfinance'])
+    parser.add_argument('--render-workers', type=int, default=2)
+    parser.add_argument('--render-warmup', type=float, default=3, help='с на прогрев пула')
+    parser.add_argument('--telegram-latency', type=float, default=0.15, help='задержка Bot API, с')
+    parser.add_argument('--telegram-rate', type=float, default=25, help='сообщений/с')
+    parser.add_argument('--send-timeout', type=float, default=120)
+    parser.add_argument('--scan-workers', type=int, default=1, help='процессов-шардов сканирования')
+    parser.add_argument('--log-level', default='WARNING', help='уровень лога бота')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(bench(args, args.worker))
+        return
+
+    for symbols in args.symbols.split(','):
+        subprocess.run([sys.executable, __file__, *sys.argv[1:], '--worker', symbols], check=True, cwd=ROOT)
+
+
+if __name__ == '__main__':
+    main()
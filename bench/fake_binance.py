@@ -0,0 +1,204 @@
+# bench/fake_binance.py
+"""
+Локальная имитация Binance FAPI для бенчмарков и ручной проверки:
+GET /fapi/v1/ticker/24hr, GET /fapi/v1/klines и WebSocket /stream (kline-потоки).
+Задержка, джиттер, доля 5xx-ошибок и 429 настраиваются; заголовок
+X-MBX-USED-WEIGHT-1M считается как у Binance.
+
+    python bench/fake_binance.py --symbols 300 --latency 50 --jitter 20 --port 8081
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import zlib
+
+import numpy as np
+from aiohttp import web
+
+INTERVAL_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000, '1h': 3_600_000, '4h': 14_400_000}
+
+
+def kline_weight(limit):
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class FakeBinance:
+    def __init__(self, symbols=300, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 weight_limit=2400, seed=0):
+        self.symbols = [f"FAKE{i}USDT" for i in range(symbols)]
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.weight_limit = weight_limit
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._weight_minute = 0
+        self._weight = 0
+
+    # --- данные ---
+    def candles(self, symbol, interval, start, end):
+        """Детерминированные свечи символа с open time в [start, end)."""
+        step = INTERVAL_MS[interval]
+        ts = np.arange(start // step * step, end, step, dtype=np.int64)
+        seed = zlib.crc32(symbol.encode())
+        base = 1 + seed % 1000
+        # Цена — гладкая функция времени, поэтому одна и та же свеча всегда одинакова
+        phase = ts / step
+        close = base * (1 + 0.02 * np.sin(phase / 7 + seed) + 0.01 * np.sin(phase * 1.3 + seed / 3))
+        open_ = base * (1 + 0.02 * np.sin((phase - 1) / 7 + seed) + 0.01 * np.sin((phase - 1) * 1.3 + seed / 3))
+        high = np.maximum(open_, close) * 1.002
+        low = np.minimum(open_, close) * 0.998
+        volume = 1000 + (seed % 97) * 10 * (1 + np.cos(phase))
+        return ts, open_, high, low, close, volume
+
+    def kline_rows(self, symbol, interval, limit, start_time=None):
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        if start_time is None:
+            start = now - (limit - 1) * step
+        else:
+            start = start_time
+        ts, o, h, l, c, v = self.candles(symbol, interval, start, now + 1)
+        ts, o, h, l, c, v = (a[:limit] for a in (ts, o, h, l, c, v))
+        return [
+            [int(t), f"{o_:.8f}", f"{h_:.8f}", f"{l_:.8f}", f"{c_:.8f}", f"{v_:.3f}", int(t) + step - 1,
+             f"{v_ * c_:.4f}", 100, "0", "0", "0"]
+            for t, o_, h_, l_, c_, v_ in zip(ts, o, h, l, c, v)
+        ]
+
+    # --- HTTP ---
+    def _use_weight(self, weight):
+        minute = int(time.time() // 60)
+        if minute != self._weight_minute:
+            self._weight_minute, self._weight = minute, 0
+        self._weight += weight
+        return {'X-MBX-USED-WEIGHT-1M': str(self._weight)}
+
+    async def _delay(self):
+        delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _fault(self, headers):
+        self.requests += 1
+        if self._weight > self.weight_limit or self.rng.random() < self.rate_limit_rate:
+            self.rate_limited += 1
+            return web.json_response({"code": -1003, "msg": "Too many requests"}, status=429,
+                                     headers={**headers, 'Retry-After': '1'})
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"code": -1000, "msg": "Internal error"}, status=503, headers=headers)
+        return None
+
+    async def ticker_24hr(self, request):
+        await self._delay()
+        headers = self._use_weight(40)
+        fault = self._fault(headers)
+        if fault is not None:
+            return fault
+        data = []
+        for i, symbol in enumerate(self.symbols):
+            seed = zlib.crc32(symbol.encode())
+            data.append({
+                "symbol": symbol,
+                "priceChangePercent": f"{(seed % 2000) / 100 - 10:.3f}",
+                "lastPrice": f"{1 + seed % 1000:.4f}",
+                "quoteVolume": f"{(seed % 5000) * 1_000_000:.2f}",
+                "count": 1000 + seed % 100000,
+            })
+        return web.json_response(data, headers=headers)
+
+    async def klines(self, request):
+        await self._delay()
+        q = request.query
+        limit = int(q.get('limit', 500))
+        headers = self._use_weight(kline_weight(limit))
+        fault = self._fault(headers)
+        if fault is not None:
+            return fault
+        if q.get('symbol') not in self.symbols or q.get('interval') not in INTERVAL_MS:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400, headers=headers)
+        start_time = int(q['startTime']) if 'startTime' in q else None
+        rows = self.kline_rows(q['symbol'], q['interval'], limit, start_time)
+        return web.json_response(rows, headers=headers)
+
+    # --- WebSocket ---
+    async def stream(self, request):
+        """
+        Комбинированный kline-поток как у Binance: на каждой границе интервала по каждому
+        символу приходит только что закрытая свеча — её t равно открытию свечи, которая
+        до этой границы была незакрытой (последней в ответе /klines).
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = []
+        for name in request.query.get('streams', '').split('/'):
+            symbol, _, interval = name.partition('@kline_')
+            if interval in INTERVAL_MS:
+                streams.append((name, symbol.upper(), interval))
+
+        async def send_closed():
+            while streams:
+                now = int(time.time() * 1000)
+                boundary = min((now // INTERVAL_MS[i] + 1) * INTERVAL_MS[i] for _, _, i in streams)
+                await asyncio.sleep((boundary - now) / 1000)
+                for name, symbol, interval in streams:
+                    step = INTERVAL_MS[interval]
+                    if boundary % step:
+                        continue
+                    row = self.kline_rows(symbol, interval, 1, start_time=boundary - step)[0]
+                    await ws.send_str(json.dumps({"stream": name, "data": {
+                        "e": "kline", "E": boundary, "s": symbol,
+                        "k": {"t": row[0], "T": row[6], "s": symbol, "i": interval,
+                              "o": row[1], "h": row[2], "l": row[3], "c": row[4], "v": row[5], "x": True},
+                    }}))
+
+        sender = asyncio.create_task(send_closed())
+        try:
+            # Чтение нужно, чтобы отвечать на ping клиента (heartbeat) и заметить закрытие
+            async for _ in ws:
+                pass
+        finally:
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+        return ws
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/fapi/v1/ticker/24hr', self.ticker_24hr)
+        app.router.add_get('/fapi/v1/klines', self.klines)
+        app.router.add_get('/stream', self.stream)
+        return app
+
+
+def serve(port, **kwargs):
+    web.run_app(FakeBinance(**kwargs).app(), host='127.0.0.1', port=port, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--symbols', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0, help='мс')
+    parser.add_argument('--jitter', type=float, default=0, help='мс')
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0)
+    args = parser.parse_args()
+    print(f"Fake Binance FAPI: http://127.0.0.1:{args.port}/fapi/v1 ({args.symbols} символов)")
+    serve(args.port, symbols=args.symbols, latency_ms=args.latency, jitter_ms=args.jitter,
+          error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,91 +1,331 @@
 # bot.py
 import asyncio
 import pytz
-import telegram
 import os
+import math
 import sys
+import time
 from telegram import Update, KeyboardButton, ReplyKeyboardMarkup
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from monitor.fetcher import get_all_futures_tickers, fetch_ohlcv_binance, fetch_ohlcv_chart  # + fetch_ohlcv_chart
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from monitor.fetcher import get_ticker_stats, update_candles, interval_ms
+from monitor.client import client
+from monitor.buffer import store
 from monitor.analyzer import analyze
-from monitor.logger import log
-from monitor.settings import load_config, save_config
-from monitor.charts import create_chart  # новый импорт
-
-config = load_config()
+from monitor.logger import log, set_level, shutdown as shutdown_logging, DEBUG, WARNING, ERROR
+from monitor.settings import ConfigStore, parse_human_number
+from monitor.render_pool import RenderPool
+from monitor.screener import screen
+from monitor.stream import KlineStream
+from monitor.scheduler import WeightLimiter, candle_trigger
+from monitor.dispatcher import SignalDispatcher
+from monitor.storage import DiskCandleStore, default_data_dir
+from monitor.indicators import engine
+from monitor import metrics
+from monitor.resample import Resampler
+from monitor.scanner import Scanner
+from monitor.shards import ShardCoordinator
+from monitor.subscribers import Subscriber, SubscriberIndex, SubscriberRegistry
+
+config = ConfigStore.load()
+set_level(config.get('log_level', 'INFO'))
 scheduler = AsyncIOScheduler(timezone=pytz.UTC)
-semaphore = asyncio.Semaphore(10)
-
-EXCLUDED_KEYWORDS = ["ALPHA", "WEB3", "AI", "BOT"]
+limiter = WeightLimiter(
+    initial=config.get('concurrency', 10),
+    max_limit=config.get('max_concurrency', 40)
+)
+client.observers.append(limiter.observe)
+client.observers.append(metrics.observe_response)
+scan_lock = asyncio.Lock()
+delivery_tasks = set()
+dispatcher = SignalDispatcher(
+    chat_interval=config.get('telegram_chat_interval', 3.0),
+    global_rate=config.get('telegram_global_rate', 25),
+    cooldown=config.get('signal_cooldown', 900),
+    merge_limit=config.get('signal_merge_limit', 5)
+)
+stream = None
+resampler = Resampler(store, interval_ms)
+scanner = Scanner(limiter, resampler)
+coordinator = None
+analyzed_bars = {}
+subscribers = SubscriberRegistry.load(config.get('data_dir') or default_data_dir())
+_subscription_index = [None, None]
+quote_volumes = {}
+render_pool = RenderPool(
+    workers=config.get('render_workers', 2),
+    timeout=config.get('render_timeout', 20),
+    max_pending=config.get('render_queue'),
+    renderer=config.get('chart_renderer', 'mplfinance'),
+    dpi=config.get('chart_dpi', 120),
+    fmt=config.get('chart_format', 'png')
+)
+metrics_server = metrics.MetricsServer(port=config.get('metrics_port', 80))
+metrics.api_concurrency.set_function(lambda: limiter.limit)
+metrics.telegram_sent.set_function(lambda: dispatcher.sent)
+metrics.telegram_dropped.set_function(lambda: dispatcher.dropped)
+metrics.telegram_queue.set_function(lambda: len(dispatcher))
+
+def on_job_skipped(event):
+    if event.job_id == 'monitor':
+        metrics.cycles_total.inc(result='skipped' if event.code == EVENT_JOB_MAX_INSTANCES else 'missed')
+
+scheduler.add_listener(on_job_skipped, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+
+def config_timeframes():
+    """
+    Таймфреймы основного чата и их настройки: config['timeframes'] —
+    {tf: ключи config, которые переопределяются для этого tf}, иначе один config['timeframe'].
+    """
+    timeframes = config.get('timeframes') or {config['timeframe']: {}}
+    return {tf: {**config, **(overrides or {})} for tf, overrides in timeframes.items() if tf in interval_ms}
+
+def subscription_index():
+    """
+    Индекс получателей сигналов: основной чат (config['chat_id']) с порогами из config
+    и подписчики из subscribers.json. Перестраивается только после изменения одного из них.
+    """
+    key = (config.version, subscribers.version)
+    if _subscription_index[0] != key:
+        owner = []
+        if config.get('chat_id'):
+            for tf, tf_config in config_timeframes().items():
+                threshold = tf_config.get('price_change_threshold', 0) if tf_config.get('price_change_filter') else 0.0
+                owner.append(Subscriber(str(config['chat_id']), tf, tf_config.get('volume_filter') or 0.0, threshold))
+        _subscription_index[:] = [key, SubscriberIndex(owner + subscribers.all())]
+    return _subscription_index[1]
+
+def monitored_timeframes():
+    """
+    Таймфреймы основного чата и подписчиков. Порог изменения — минимальный среди
+    получателей таймфрейма: кому какой сигнал отправить, решает subscription_index().
+    """
+    timeframes = config_timeframes()
+    for tf, threshold in subscription_index().timeframes().items():
+        tf_config = timeframes.get(tf, config)
+        timeframes[tf] = {**tf_config, 'price_change_filter': True, 'price_change_threshold': threshold}
+    return timeframes
+
+def base_timeframe():
+    """Таймфрейм, который запрашивается у биржи; остальные считаются из него локально."""
+    if config.get('timeframes') or len(monitored_timeframes()) > 1:
+        return config.get('base_timeframe', '1m')
+    return config['timeframe']
+
+def scan_timeframe():
+    """Самый мелкий из таймфреймов мониторинга задаёт частоту цикла."""
+    return min(monitored_timeframes(), key=interval_ms.get, default=base_timeframe())
+
+def configure_store():
+    base = base_timeframe()
+    derived = [tf for tf in monitored_timeframes() if tf != base]
+    resampler.base = base
+    store.capacities.clear()
+    if derived:
+        # Базовый буфер должен покрывать целиком бар самого старшего таймфрейма
+        bars = max(interval_ms[tf] for tf in derived) // interval_ms[base]
+        store.capacities[base] = max(store.capacity, bars + 60)
+    store.max_series = config.get('max_series', 3000) * (len(derived) + 1)
 
 def update_config(key, value):
     config[key] = value
-    save_config(config)
-
-def parse_human_number(value: str) -> float:
-    value = value.strip().upper()
-    multiplier = 1
-    if value.endswith("K"):
-        multiplier = 1_000
-        value = value[:-1]
-    elif value.endswith("M"):
-        multiplier = 1_000_000
-        value = value[:-1]
-    elif value.endswith("B"):
-        multiplier = 1_000_000_000
-        value = value[:-1]
-    try:
-        return float(value) * multiplier
-    except ValueError:
-        raise ValueError("Неверный формат числа. Используйте: 100K, 2.5M, 1B")
+    config.save()
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     buttons = [
         [KeyboardButton("Start Monitor"), KeyboardButton("Stop Monitor")],
         [KeyboardButton("Set Timeframe"), KeyboardButton("Set Volume")],
         [KeyboardButton("Set Change"), KeyboardButton("Toggle Change")],
-        [KeyboardButton("Status"), KeyboardButton("Reload Bot")]
+        [KeyboardButton("Toggle Stream"), KeyboardButton("Status")],
+        [KeyboardButton("Reload Bot")]
     ]
     reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True)
     await update.message.reply_text("Бот готов к работе.", reply_markup=reply_markup)
 
-async def run_monitor():
-    tickers = await get_all_futures_tickers()
-    tickers = [t for t in tickers if not any(k in t.upper() for k in EXCLUDED_KEYWORDS)]
-    log(f"Всего тикеров после фильтра: {len(tickers)}")
+def format_subscription(sub):
+    return (f"{sub.timeframe}: объём от {human_readable_number(int(sub.volume_filter))}, "
+            f"изменение от {sub.change_threshold:g}%")
 
-    if not tickers:
-        log("Тикеры не найдены, проверка остановлена.")
+async def restart_if_timeframes_changed(before):
+    """Подписка могла добавить или убрать таймфрейм — перезапускаем мониторинг под новый набор."""
+    if set(monitored_timeframes()) != before and (stream is not None or scheduler.get_job('monitor')):
+        await start_monitoring()
+
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/subscribe <tf> [объём] [порог %] — сигналы таймфрейма в этот чат."""
+    args = context.args
+    if not args or args[0] not in interval_ms:
+        await update.message.reply_text(
+            f"Использование: /subscribe <таймфрейм> [объём] [порог %], таймфреймы: {', '.join(interval_ms)}")
+        return
+    try:
+        volume = parse_human_number(args[1]) if len(args) > 1 else float(config.get('volume_filter', 0) or 0)
+        threshold = float(args[2]) if len(args) > 2 else float(config.get('price_change_threshold', 0))
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return
+    before = set(monitored_timeframes())
+    sub = Subscriber(str(update.effective_chat.id), args[0], volume, threshold)
+    subscribers.add(sub)
+    await restart_if_timeframes_changed(before)
+    await update.message.reply_text(f"Подписка оформлена: {format_subscription(sub)}")
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/unsubscribe [tf] — отписка от одного таймфрейма или от всех."""
+    before = set(monitored_timeframes())
+    removed = subscribers.remove(update.effective_chat.id, context.args[0] if context.args else None)
+    await restart_if_timeframes_changed(before)
+    await update.message.reply_text(f"Удалено подписок: {removed}")
+
+async def subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    subs = subscribers.for_chat(update.effective_chat.id)
+    if not subs:
+        await update.message.reply_text("Подписок нет. Оформить: /subscribe <таймфрейм> [объём] [порог %]")
         return
+    await update.message.reply_text("\n".join(format_subscription(sub) for sub in subs))
+
+async def get_filtered_tickers():
+    stats = await get_ticker_stats()
+    quote_volumes.clear()
+    quote_volumes.update((s.symbol, s.quote_volume) for s in stats)
+    # Общий отсев — по самому мягкому фильтру объёма среди получателей
+    index = subscription_index()
+    screen_config = {**config, 'volume_filter': index.min_volume()} if len(index) else config
+    tickers = [s.symbol for s in screen(stats, screen_config)]
+    log(f"Всего тикеров после фильтра: {len(tickers)}")
+    return tickers
 
-    total, signals = 0, 0
+async def run_monitor():
+    # Циклы никогда не пересекаются: если предыдущий ещё идёт, этот пропускаем
+    if scan_lock.locked():
+        metrics.cycles_total.inc(result='skipped')
+        log("Предыдущий цикл ещё не завершён, пропуск", WARNING)
+        return
+    async with scan_lock:
+        started = time.monotonic()
+        await scan_cycle()
+        elapsed = time.monotonic() - started
+        metrics.cycle_seconds.observe(elapsed)
+        metrics.cycles_total.inc(result='completed')
+        if elapsed * 1000 > interval_ms.get(scan_timeframe(), 60_000):
+            metrics.cycle_overruns_total.inc()
+            log(f"Цикл занял {elapsed:.1f}с — дольше свечи {scan_timeframe()}", WARNING)
+        log(f"Цикл занял {elapsed:.1f}с, "
+            f"параллельность {limiter.limit}, вес {limiter.used_weight}/мин")
+
+async def scan_cycle():
+    tickers = await get_filtered_tickers()
 
-    async def process_symbol(symbol):
-        nonlocal total, signals
-        async with semaphore:
-            try:
-                df = await fetch_ohlcv_binance(symbol, config['timeframe'])
-                if df.empty:
-                    log(f"[{symbol}] свечи не получены")
-                    return
+    if not tickers:
+        log("Тикеры не найдены, проверка остановлена.", WARNING)
+        return
 
-                is_signal, info = analyze(df, config)
-                total += 1
+    evicted = store.retain(tickers)
+    engine.retain(tickers)
+    if evicted:
+        log(f"Удалено буферов делистнутых тикеров: {evicted}")
+
+    configure_store()
+    base = base_timeframe()
+    window = config.get('analyze_window', 100)
+    now = int(time.time() * 1000)
+    due = {}
+    for timeframe, tf_config in monitored_timeframes().items():
+        step = interval_ms[timeframe]
+        current_open = now // step * step
+        # Каждый бар таймфрейма анализируется один раз, когда он закрылся
+        if analyzed_bars.get(timeframe) == current_open:
+            continue
+        analyzed_bars[timeframe] = current_open
+        due[timeframe] = tf_config
+
+    if coordinator is not None:
+        scanned, signals = await coordinator.scan(
+            tickers, due, base, now, window, store.capacities, store.max_series)
+    else:
+        scanned, signals = await scanner.scan(tickers, due, base, now, window)
+    metrics.symbols_scanned.set(scanned)
+    metrics.signals_total.inc(len(signals))
 
-                if is_signal:
-                    signals += 1
-                    await send_signal(symbol, df, info)
-                else:
-                    log(f"[{symbol}] Условия не выполнены")
-            except Exception as e:
-                log(f"Ошибка {symbol}: {e}")
+    # Рендер и отправка — в фоне, вне scan_lock: очередь графиков не удлиняет цикл
+    for signal in signals:
+        task = asyncio.create_task(deliver(signal))
+        delivery_tasks.add(task)
+        task.add_done_callback(delivery_tasks.discard)
 
-    await asyncio.gather(*(process_symbol(symbol) for symbol in tickers))
-    log(f"Обработано: {total}, Сигналов: {signals}")
+async def deliver(signal):
+    try:
+        await send_signal(signal.symbol, signal.frame, signal.info, signal.timeframe, chart=signal.chart)
+    except Exception as e:
+        log(f"Ошибка {signal.symbol}: {e}", ERROR)
+
+async def cancel_deliveries():
+    for task in list(delivery_tasks):
+        task.cancel()
+    await asyncio.gather(*delivery_tasks, return_exceptions=True)
+
+async def on_candle_close(symbol, df):
+    base = base_timeframe()
+    # Закрытая базовая свеча закрывает и бар старшего таймфрейма, если время кратно его длине
+    close_time = int(df['timestamp'].iloc[-1].value // 1_000_000) + interval_ms[base]
+    for timeframe, tf_config in monitored_timeframes().items():
+        if close_time % interval_ms[timeframe]:
+            continue
+        try:
+            if timeframe != base:
+                if resampler.needs_backfill(symbol, timeframe):
+                    async with limiter:
+                        await update_candles(symbol, timeframe)
+                buf = resampler.update(symbol, timeframe)
+                frame = buf.to_frame(config.get('analyze_window', 100), until=close_time)
+            else:
+                buf, frame = store.get(symbol, timeframe), df
+            with metrics.stage_seconds.time(stage='analyze'):
+                engine.update(symbol, timeframe, buf.timestamps(), buf.column('close'), until=close_time)
+                indicators = {name: values[0] for name, values in engine.latest([symbol], timeframe).items()}
+                is_signal, info = analyze(frame, tf_config, indicators)
+            if is_signal:
+                metrics.signals_total.inc()
+                await send_signal(symbol, frame, info, timeframe)
+        except Exception as e:
+            log(f"Ошибка {symbol} {timeframe}: {e}", ERROR)
+
+async def start_stream():
+    global stream
+    await stop_stream()
+    tickers = await get_filtered_tickers()
+    if not tickers:
+        log("Тикеры не найдены, стрим не запущен.", WARNING)
+        return
+    configure_store()
+    stream = KlineStream(
+        tickers, base_timeframe(), on_candle_close,
+        shard_size=config.get('stream_shard_size', 150)
+    )
+    await stream.start()
+
+async def stop_stream():
+    global stream
+    if stream is not None:
+        await stream.stop()
+        stream = None
+
+async def start_monitoring():
+    if scheduler.get_job('monitor'):
+        scheduler.remove_job('monitor')
+    await stop_stream()
+    if config.get('stream_mode'):
+        await start_stream()
+    else:
+        scheduler.add_job(
+            run_monitor, candle_trigger(scan_timeframe(), config.get('scan_offset_seconds', 2)),
+            id='monitor', max_instances=1, coalesce=True, misfire_grace_time=30
+        )
 
-async def send_signal(symbol, df, info):
-    bot = telegram.Bot(token=config['telegram_token'])
+async def send_signal(symbol, df, info, timeframe=None, chart=None):
+    timeframe = timeframe or config['timeframe']
+    tf_config = monitored_timeframes().get(timeframe, config)
 
     try:
         last_close = float(df['close'].iloc[-1])
@@ -94,9 +334,18 @@ async def send_signal(symbol, df, info):
         last_close = prev_close = None
 
     tf_change = ((last_close - prev_close) / prev_close * 100) if prev_close else 0.0
+    recipients = subscription_index().match(timeframe, tf_change, quote_volumes.get(symbol, math.inf))
+    if not recipients:
+        log(f"[{symbol}] {timeframe}: нет подписчиков с подходящими порогами", DEBUG)
+        return
+    # Кулдаун у каждого чата свой: та же монета на том же таймфрейме не приходит
+    # в чат чаще signal_cooldown секунд, но другим подписчикам сигнал не блокирует
+    if all(dispatcher.on_cooldown((chat_id, symbol, timeframe)) for chat_id in recipients):
+        log(f"[{symbol}] {timeframe}: сигнал пропущен (кулдаун)", DEBUG)
+        return
     signal_type_text = "ПАМП" if tf_change > 0 else "ДАМП"
 
-    if abs(tf_change) >= max(2.0, config.get('price_change_threshold', 5.0)):
+    if abs(tf_change) >= max(2.0, tf_config.get('price_change_threshold', 5.0)):
         brief_info = "Резкий рост! Возможен памп" if tf_change > 0 else "Резкое падение. Возможен дамп"
     else:
         brief_info = "Движение есть, требуется дополнительный анализ."
@@ -105,7 +354,7 @@ async def send_signal(symbol, df, info):
     tradingview_url = f"https://www.tradingview.com/chart/?symbol=BINANCE:{symbol_tv}.P"
 
     html = (
-        f"<b>{signal_type_text}</b> | <b>{tf_change:.2f}%</b>\n"
+        f"<b>{signal_type_text}</b> | <b>{tf_change:.2f}%</b> | {timeframe}\n"
         f"Монета: <code>{symbol}</code>\n"
         f"Цена сейчас: <b>{last_close:.6f} USDT</b>\n"
         f"{brief_info}\n\n"
@@ -113,59 +362,47 @@ async def send_signal(symbol, df, info):
         f"<i>Доп. инфо:</i> {info if isinstance(info, str) else ''}"
     )
 
-    # --- ГРАФИК ---
-    chart_buffer = None
+    # --- ГРАФИК (в пуле процессов; данные из сигнала скана или из буфера свечей) ---
+    chart_png = None
     try:
-        chart_df = await fetch_ohlcv_chart(symbol, config['timeframe'], max_limit=200)
-        if not chart_df.empty:
-            chart_buffer = create_chart(chart_df, symbol, config['timeframe'])
+        if chart is None:
+            buf = store.get(symbol, timeframe)
+            if buf is None or not len(buf):
+                buf = await update_candles(symbol, timeframe)
+            if len(buf):
+                ts, ohlcv = buf.timestamps(200), buf.values(200)
+                chart = (ts, ohlcv, engine.series(symbol, timeframe, ts, ohlcv[:, 3]))
+        if chart is not None:
+            chart_png = await render_pool.render(symbol, timeframe, *chart)
     except Exception as e:
-        log(f"Ошибка генерации графика для {symbol}: {e}")
+        log(f"Ошибка генерации графика для {symbol}: {e}", ERROR)
 
-    # --- ОТПРАВКА ---
-    try:
-        if chart_buffer and chart_buffer.getbuffer().nbytes > 0:
-            await bot.send_photo(
-                chat_id=config['chat_id'],
-                photo=chart_buffer,
-                caption=html,
-                parse_mode="HTML"
-            )
-            log(f"[{symbol}] Сигнал + график отправлены")
-        else:
-            await bot.send_message(
-                chat_id=config['chat_id'],
-                text=html,
-                parse_mode="HTML",
-                disable_web_page_preview=True
-            )
-            log(f"[{symbol}] Сигнал отправлен (без графика)")
-    except Exception as e:
-        log(f"Ошибка отправки {symbol}: {e}")
-        try:
-            await bot.send_message(chat_id=config['chat_id'], text=html, parse_mode="HTML")
-        except:
-            pass
+    # --- ОТПРАВКА (в фоне, через очередь диспетчера); график один на всех получателей ---
+    # Кулдаун проверяется ещё раз: пока рисовался график, чату мог уйти тот же сигнал
+    for chat_id in recipients:
+        key = (chat_id, symbol, timeframe)
+        if not dispatcher.on_cooldown(key) and dispatcher.submit(chat_id, html, photo=chart_png, symbol=symbol):
+            dispatcher.mark(key)
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
 
     if text == "Start Monitor":
         config['bot_status'] = True
-        save_config(config)
-        if scheduler.get_job('monitor'):
-            scheduler.remove_job('monitor')
-        scheduler.add_job(run_monitor, 'interval', minutes=1, id='monitor')
+        config.save()
+        await start_monitoring()
         await update.message.reply_text("Мониторинг запущен")
 
     elif text == "Stop Monitor":
         config['bot_status'] = False
-        save_config(config)
-        scheduler.remove_all_jobs()
+        config.save()
+        if scheduler.get_job('monitor'):
+            scheduler.remove_job('monitor')
+        await stop_stream()
         await update.message.reply_text("Мониторинг остановлен")
 
     elif text == "Set Timeframe":
-        await update.message.reply_text("Введите таймфрейм (1m, 5m, 15m):")
+        await update.message.reply_text(f"Введите таймфрейм ({', '.join(interval_ms)}):")
         context.user_data['awaiting'] = 'timeframe'
 
     elif text == "Set Volume":
@@ -178,11 +415,20 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif text == "Toggle Change":
         config['price_change_filter'] = not config['price_change_filter']
-        save_config(config)
+        config.save()
         await update.message.reply_text(
             f"Фильтр изменения: {'включен' if config['price_change_filter'] else 'выключен'}"
         )
 
+    elif text == "Toggle Stream":
+        config['stream_mode'] = not config.get('stream_mode', False)
+        config.save()
+        if config.get('bot_status'):
+            await start_monitoring()
+        await update.message.reply_text(
+            f"Потоковый режим (WebSocket): {'включен' if config['stream_mode'] else 'выключен'}"
+        )
+
     elif text == "Status":
         vol = config.get('volume_filter', 0)
         try:
@@ -190,11 +436,17 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except Exception:
             vol_str = f"{vol:,}"
         msg = (
-            f"Таймфрейм: {config.get('timeframe')}\n"
+            f"Таймфрейм: {', '.join(monitored_timeframes())}"
+            f"{f' (база {base_timeframe()})' if config.get('timeframes') else ''}\n"
             f"Фильтр объема: {vol_str}\n"
             f"Фильтр изменения: {config.get('price_change_filter')} ({config.get('price_change_threshold')}%)\n"
-            f"Статус бота: {'включен' if config.get('bot_status') else 'выключен'}"
+            f"Режим: {'WebSocket-стрим' if config.get('stream_mode') else 'REST-опрос'}\n"
+            f"Подписчиков: {len(subscribers)}\n"
+            f"Статус бота: {'включен' if config.get('bot_status') else 'выключен'}\n\n"
+            f"{metrics.summary()}"
         )
+        if coordinator is not None:
+            msg += f"\n{coordinator.summary()}"
         await update.message.reply_text(msg)
 
     elif text == "Reload Bot":
@@ -205,8 +457,14 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     elif 'awaiting' in context.user_data:
         if context.user_data['awaiting'] == 'timeframe':
-            update_config('timeframe', text)
-            await update.message.reply_text(f"Таймфрейм обновлён: {text}")
+            if text not in interval_ms:
+                await update.message.reply_text(
+                    f"Неизвестный таймфрейм {text}, доступны: {', '.join(interval_ms)}")
+            else:
+                update_config('timeframe', text)
+                if stream is not None or scheduler.get_job('monitor'):
+                    await start_monitoring()
+                await update.message.reply_text(f"Таймфрейм обновлён: {text}")
         elif context.user_data['awaiting'] == 'volume':
             try:
                 volume_value = parse_human_number(text)
@@ -228,15 +486,96 @@ def human_readable_number(n: int) -> str:
         return f"{n/1_000:.2f}K"
     return str(n)
 
+async def compact_candles():
+    # В шардированном REST-режиме файлы пишут воркеры, и сжимают их тоже они
+    if coordinator is not None and not config.get('stream_mode'):
+        await coordinator.compact()
+    else:
+        await asyncio.to_thread(store.disk.compact_all)
+
+def start_coordinator():
+    """Режим нескольких процессов сканирования (scan_workers > 1)."""
+    global coordinator
+    workers = config.get('scan_workers', 1)
+    if workers <= 1 or coordinator is not None:
+        return
+    coordinator = ShardCoordinator(
+        workers,
+        options={
+            'log_level': config.get('log_level', 'INFO'),
+            # Лимит веса общий на IP, поэтому параллельность делится между шардами
+            'concurrency': max(2, config.get('concurrency', 10) // workers),
+            'max_concurrency': max(2, config.get('max_concurrency', 40) // workers),
+            'data_dir': (config.get('data_dir') or default_data_dir()) if config.get('candle_store', True) else None,
+            'candle_store_rows': config.get('candle_store_rows', 1000),
+        },
+        timeout=config.get('shard_timeout', 50),
+    )
+    coordinator.start()
+
+async def stop_coordinator():
+    global coordinator
+    if coordinator is not None:
+        await coordinator.stop()
+        coordinator = None
+
+def init_candle_store():
+    if not config.get('candle_store', True):
+        return
+    root = config.get('data_dir') or default_data_dir()
+    store.disk = DiskCandleStore(root, max_rows=config.get('candle_store_rows', 1000))
+    scheduler.add_job(compact_candles, 'interval', hours=1, id='compact', replace_existing=True)
+    log(f"Хранилище свечей: {store.disk.root}")
+
+async def on_startup(app):
+    init_candle_store()
+    await client.start()
+    render_pool.start()
+    dispatcher.bot = app.bot
+    dispatcher.start()
+    start_coordinator()
+    if config.get('metrics', True):
+        await metrics_server.start()
+
+async def on_shutdown(app):
+    await stop_stream()
+    await cancel_deliveries()
+    await stop_coordinator()
+    await dispatcher.stop()
+    await client.close()
+    await metrics_server.stop()
+    render_pool.close()
+    config.flush()
+    subscribers.flush()
+
 async def reload_bot():
     log("Выполняется перезагрузка бота...")
     scheduler.remove_all_jobs()
+    await stop_stream()
+    await cancel_deliveries()
+    await stop_coordinator()
+    await dispatcher.stop()
+    await client.close()
+    await metrics_server.stop()
+    render_pool.close()
+    config.flush()
+    subscribers.flush()
+    shutdown_logging()
     python = sys.executable
     os.execl(python, python, *sys.argv)
 
 if __name__ == '__main__':
-    app = ApplicationBuilder().token(config['telegram_token']).build()
+    app = (
+        ApplicationBuilder()
+        .token(config['telegram_token'])
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     app.add_handler(CommandHandler('start', start))
+    app.add_handler(CommandHandler('subscribe', subscribe))
+    app.add_handler(CommandHandler('unsubscribe', unsubscribe))
+    app.add_handler(CommandHandler('subscriptions', subscriptions))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     scheduler.start()
     print("Бот запущен. Используй /start в Telegram.")
@@ -1,11 +1,78 @@
-def analyze(df, config):
+import numpy as np
+
+
+def analyze_batch(closes, volumes, config, indicators=None):
+    """
+    Векторный анализ всей вселенной за один проход NumPy.
+    closes, volumes — массивы (n_symbols, N) последних N свечей (слева может быть NaN).
+    indicators — последние значения monitor.indicators по символам (колонка -> массив).
+    Возвращает (индексы сработавших символов, изменение последней свечи в %).
+
+    Условия (необязательные ключи config):
+      price_change_filter / price_change_threshold — |изменение| >= порога;
+      min_candle_volume — объём последней свечи в USDT (close * volume);
+      volume_spike_ratio — объём последней свечи / средний объём предыдущих;
+      change_zscore — |z-оценка| изменения относительно предыдущих свечей;
+      rsi_extreme — [low, high]: RSI <= low или RSI >= high (нужны indicators);
+      bb_breakout — закрытие за полосами Боллинджера (нужны indicators).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    if closes.ndim != 2 or closes.shape[1] < 2:
+        return np.empty(0, dtype=np.intp), np.full(len(closes), np.nan)
+
+    last, prev = closes[:, -1], closes[:, -2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (last - prev) / prev * 100
+    mask = np.isfinite(change)
+
+    if config.get('price_change_filter'):
+        mask &= np.abs(change) >= config.get('price_change_threshold', 0)
+
+    min_candle_volume = config.get('min_candle_volume')
+    if min_candle_volume:
+        mask &= volumes[:, -1] * last >= min_candle_volume
+
+    spike_ratio = config.get('volume_spike_ratio')
+    if spike_ratio:
+        with np.errstate(invalid='ignore'):
+            mean_volume = np.nanmean(volumes[:, :-1], axis=1)
+        mask &= volumes[:, -1] >= spike_ratio * mean_volume
+
+    zscore = config.get('change_zscore')
+    if zscore and closes.shape[1] > 3:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(closes[:, :-1], axis=1) / closes[:, :-2] * 100
+            z = (change - np.nanmean(returns, axis=1)) / np.nanstd(returns, axis=1)
+        mask &= np.abs(z) >= zscore
+
+    rsi_extreme = config.get('rsi_extreme')
+    if rsi_extreme and indicators is not None:
+        rsi = np.asarray(indicators['rsi'], dtype=np.float64)
+        mask &= (rsi <= rsi_extreme[0]) | (rsi >= rsi_extreme[1])
+
+    if config.get('bb_breakout') and indicators is not None:
+        upper = np.asarray(indicators['upper'], dtype=np.float64)
+        lower = np.asarray(indicators['lower'], dtype=np.float64)
+        mask &= (last > upper) | (last < lower)
+
+    return np.flatnonzero(mask), change
+
+
+def signal_info(tf_change):
+    return f"🚀 Сигнал | tf_change={abs(tf_change):.2f}%"
+
+
+def analyze(df, config, indicators=None):
     """
     Простая логика анализа: возвращает True если изменение последней свечи > threshold
+    indicators — последние значения индикаторов символа (колонка -> число).
     """
-    last = df.iloc[-1]
-    prev = df.iloc[-2]
-    tf_change = abs((last['close'] - prev['close']) / prev['close'] * 100)
-    info = f"🚀 Сигнал | tf_change={tf_change:.2f}%"
-    if config['price_change_filter'] and tf_change < config['price_change_threshold']:
+    closes = df['close'].to_numpy(dtype=np.float64)[None, :]
+    volumes = df['volume'].to_numpy(dtype=np.float64)[None, :]
+    if indicators is not None:
+        indicators = {name: np.atleast_1d(value) for name, value in indicators.items()}
+    fired, change = analyze_batch(closes, volumes, config, indicators)
+    if not len(fired):
         return False, "Условия не выполнены"
-    return True, info
+    return True, signal_info(change[0])
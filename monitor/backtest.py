@@ -0,0 +1,312 @@
+# monitor/backtest.py
+"""
+Офлайн-прогон правил сигнала по истории свечей из DiskCandleStore
+(<data_dir>/candles/<tf>/<SYMBOL>.bin): вся сетка price_change_threshold ×
+volume_filter считается за один векторный проход по каждому символу, без
+свечного реплея через pandas. Для каждой пары настроек — число сигналов
+и форвардная доходность по направлению сигнала через --horizons свечей.
+
+volume_filter, как и в боте, — оборот за 24ч в USDT (здесь сумма close * volume
+за скользящие сутки). Из остальных условий analyze_batch учитываются
+min_candle_volume и volume_spike_ratio из config; кулдаун не применяется.
+Если файлов нужного таймфрейма нет, бары собираются из 1m.
+
+История по умолчанию лежит отдельно от хранилища бота (<data_dir>/history): бот
+раз в час сжимает свои файлы до candle_store_rows свечей, и месяцы истории
+там не живут. Догружать историю в хранилище бота (--data-dir <data_dir>) нельзя.
+
+    python -m monitor.backtest --download 365 --top 300 --timeframe 1m
+    python -m monitor.backtest --timeframe 5m --thresholds 0.5,1,2,3 --volumes 10M,50M,100M
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+from monitor.fetcher import interval_ms
+from monitor.logger import log, WARNING, ERROR
+from monitor.resample import resample
+from monitor.settings import ConfigStore, parse_human_number
+from monitor.storage import DiskCandleStore, default_data_dir, ohlcv_view
+
+DAY_MS = 86_400_000
+KLINES_PAGE = 1000
+
+
+def stored_symbols(disk, timeframe):
+    folder = os.path.join(disk.root, timeframe)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name[:-4] for name in os.listdir(folder) if name.endswith('.bin'))
+
+
+def load_candles(disk, symbol, timeframe):
+    """(ts, ohlcv) всей истории символа; старший таймфрейм при необходимости — из 1m."""
+    rows = disk.load(symbol, timeframe)
+    if len(rows) or timeframe == '1m':
+        return rows['timestamp'], ohlcv_view(rows)
+    rows = disk.load(symbol, '1m')
+    return resample(rows['timestamp'], ohlcv_view(rows), interval_ms[timeframe])
+
+
+def _window_sum(values, n):
+    """Сумма последних n значений на каждом шаге (включая текущий); NaN, пока окно неполное."""
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    out = np.full(len(values), np.nan)
+    if len(values) >= n:
+        out[n - 1:] = csum[n:] - csum[:-n]
+    return out
+
+
+class Grid:
+    """
+    Счётчики по сетке (порог изменения × фильтр объёма). Каждый бар попадает в
+    одну ячейку гистограммы — (сколько порогов он прошёл, сколько фильтров объёма);
+    сигналы настройки (i, j) — все бары с индексами не меньше, то есть
+    обратная кумулятивная сумма гистограммы по обеим осям.
+    """
+
+    def __init__(self, thresholds, volumes, horizons, config=None):
+        self.thresholds = np.sort(np.asarray(thresholds, dtype=np.float64))
+        self.volumes = np.sort(np.asarray(volumes, dtype=np.float64))
+        self.horizons = list(horizons)
+        self.config = config or {}
+        self._shape = (len(self.thresholds) + 1, len(self.volumes) + 1)
+        self._signals = np.zeros(self._shape)
+        # по горизонту: число сигналов с известной доходностью, сумма, сумма квадратов, прибыльные
+        self._returns = {h: np.zeros((4,) + self._shape) for h in self.horizons}
+        self.symbols = 0
+        self.bars = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def add(self, ts, ohlcv, step):
+        """Добавляет историю одного символа: ts — int64 мс по возрастанию, ohlcv (n, 5)."""
+        ts = np.asarray(ts, dtype=np.int64)
+        if len(ts) < 2:
+            return
+        close, volume = ohlcv[:, 3], ohlcv[:, 4]
+        self.symbols += 1
+        self.bars += len(ts)
+        self.first_ts = int(ts[0]) if self.first_ts is None else min(self.first_ts, int(ts[0]))
+        self.last_ts = int(ts[-1]) if self.last_ts is None else max(self.last_ts, int(ts[-1]))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.full(len(ts), np.nan)
+            change[1:] = (close[1:] - close[:-1]) / close[:-1] * 100
+            # Изменение считается только между соседними свечами (без пропусков в истории)
+            change[1:][np.diff(ts) != step] = np.nan
+            turnover = _window_sum(close * volume, max(1, DAY_MS // step))
+
+            mask = (np.abs(change) >= self.thresholds[0]) & (turnover >= self.volumes[0])
+            min_candle_volume = self.config.get('min_candle_volume')
+            if min_candle_volume:
+                mask &= close * volume >= min_candle_volume
+            spike_ratio = self.config.get('volume_spike_ratio')
+            if spike_ratio:
+                # Средний объём предыдущих analyze_window - 1 свечей, как в analyze_batch
+                window = self.config.get('analyze_window', 100) - 1
+                mean_volume = (_window_sum(volume, window + 1) - volume) / window
+                mask &= volume >= spike_ratio * mean_volume
+
+        idx = np.flatnonzero(mask)
+        if not len(idx):
+            return
+        cells = (np.searchsorted(self.thresholds, np.abs(change[idx]), side='right') * self._shape[1]
+                 + np.searchsorted(self.volumes, turnover[idx], side='right'))
+        size = self._shape[0] * self._shape[1]
+        self._signals += np.bincount(cells, minlength=size).reshape(self._shape)
+
+        direction = np.sign(change[idx])
+        for h in self.horizons:
+            ahead = idx + h
+            known = ahead < len(ts)
+            known[known] &= ts[ahead[known]] - ts[idx[known]] == h * step
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fwd = (close[ahead[known]] / close[idx[known]] - 1) * 100 * direction[known]
+            known_cells = cells[known]
+            acc = self._returns[h]
+            for k, weights in enumerate((None, fwd, fwd * fwd, (fwd > 0).astype(np.float64))):
+                acc[k] += np.bincount(known_cells, weights=weights, minlength=size).reshape(self._shape)
+
+    @staticmethod
+    def _at_least(hist):
+        """Сумма по ячейкам с индексами >= (i+1, j+1) для каждой настройки (i, j)."""
+        return hist[::-1, ::-1].cumsum(0).cumsum(1)[::-1, ::-1][1:, 1:]
+
+    def signals(self):
+        return self._at_least(self._signals)
+
+    def returns(self, horizon):
+        """(mean %, std %, hit rate %) форвардной доходности по направлению сигнала."""
+        count, total, squares, wins = (self._at_least(a) for a in self._returns[horizon])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares / count - mean ** 2, 0))
+            return mean, std, wins / count * 100
+
+    def days(self):
+        return (self.last_ts - self.first_ts) / DAY_MS if self.first_ts is not None else 0.0
+
+    def report(self):
+        signals = self.signals()
+        days = max(self.days(), 1e-9)
+        stats = {h: self.returns(h) for h in self.horizons}
+        header = f"{'change %':>9}{'volume':>10}{'signals':>10}{'per day':>9}"
+        header += ''.join(f"{f'+{h} mean/hit':>17}" for h in self.horizons)
+        lines = [f"символов {self.symbols}, свечей {self.bars}, дней {self.days():.1f}", header]
+        for i, threshold in enumerate(self.thresholds):
+            for j, volume in enumerate(self.volumes):
+                line = f"{threshold:>9g}{_human(volume):>10}{int(signals[i, j]):>10}{signals[i, j] / days:>9.1f}"
+                for h in self.horizons:
+                    mean, _, hit = stats[h]
+                    cell = '—' if np.isnan(mean[i, j]) else f"{mean[i, j]:+.2f}%/{hit[i, j]:.0f}%"
+                    line += f"{cell:>17}"
+                lines.append(line)
+        return '\n'.join(lines)
+
+    def to_csv(self, path):
+        signals = self.signals()
+        stats = {h: self.returns(h) for h in self.horizons}
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(','.join(['price_change_threshold', 'volume_filter', 'signals'] + [
+                f"{name}_{h}" for h in self.horizons for name in ('mean', 'std', 'hit')]) + '\n')
+            for i, threshold in enumerate(self.thresholds):
+                for j, volume in enumerate(self.volumes):
+                    row = [f"{threshold:g}", f"{volume:g}", str(int(signals[i, j]))]
+                    for h in self.horizons:
+                        row += [f"{stats[h][k][i, j]:.6g}" for k in range(3)]
+                    f.write(','.join(row) + '\n')
+
+
+def _human(n):
+    for size, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'K')):
+        if n >= size:
+            return f"{n / size:g}{suffix}"
+    return f"{n:g}"
+
+
+def run(disk, symbols, timeframe, grid):
+    step = interval_ms[timeframe]
+    for n, symbol in enumerate(symbols, 1):
+        try:
+            ts, ohlcv = load_candles(disk, symbol, timeframe)
+            grid.add(ts, ohlcv, step)
+        except Exception as e:
+            log(f"Ошибка {symbol}: {e}", ERROR)
+        if n % 50 == 0:
+            log(f"Обработано символов: {n}/{len(symbols)}")
+    return grid
+
+
+# ===== ЗАГРУЗКА ИСТОРИИ =====
+
+async def download(disk, symbols, timeframe, days):
+    """
+    Догружает в disk недостающую историю за days суток страницами по 1000 свечей:
+    до первой сохранённой свечи и после последней. Порядок записей в файле
+    не важен — при чтении они сортируются (storage.dedupe).
+    """
+    from monitor import fetcher
+    from monitor.client import client
+    from monitor.parser import parse_klines
+    from monitor.scheduler import WeightLimiter
+
+    limiter = WeightLimiter(initial=4, max_limit=10)
+    client.observers.append(limiter.observe)
+    step = interval_ms[timeframe]
+    now = int(time.time() * 1000) // step * step
+    since = now - days * DAY_MS
+
+    async def fetch_range(symbol, start, end):
+        while start < end:
+            async with limiter:
+                data = await client.get_json(f"{fetcher.BINANCE_FAPI}/klines", params={
+                    "symbol": symbol, "interval": timeframe, "startTime": start,
+                    "endTime": end - 1, "limit": KLINES_PAGE})
+            if not data:
+                return
+            rows = parse_klines(data)
+            disk.append(symbol, timeframe, rows['timestamp'], ohlcv_view(rows))
+            start = int(rows['timestamp'][-1]) + step
+
+    async def fetch_symbol(symbol):
+        rows = disk.load(symbol, timeframe)
+        try:
+            if not len(rows):
+                await fetch_range(symbol, since, now)
+            else:
+                await fetch_range(symbol, since, int(rows['timestamp'][0]))
+                await fetch_range(symbol, int(rows['timestamp'][-1]) + step, now)
+            disk.compact(symbol, timeframe)
+        except Exception as e:
+            log(f"Ошибка загрузки {symbol}: {e}", ERROR)
+
+    await client.start()
+    try:
+        for n, symbol in enumerate(symbols, 1):
+            await fetch_symbol(symbol)
+            log(f"История {timeframe}: {symbol} ({n}/{len(symbols)})")
+    finally:
+        await client.close()
+
+
+async def top_symbols(top):
+    from monitor.client import client
+    from monitor.fetcher import get_ticker_stats
+    await client.start()
+    try:
+        stats = await get_ticker_stats()
+    finally:
+        await client.close()
+    return [s.symbol for s in sorted(stats, key=lambda s: s.quote_volume, reverse=True)[:top]]
+
+
+def main():
+    config = ConfigStore.load()
+    live_dir = config.get('data_dir') or default_data_dir()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(live_dir, 'history'),
+                        help='каталог истории (по умолчанию <data_dir>/history)')
+    parser.add_argument('--timeframe', default=config.get('timeframe', '1m'), choices=list(interval_ms))
+    parser.add_argument('--symbols', help='через запятую; по умолчанию все сохранённые')
+    parser.add_argument('--thresholds', default='0.5,1,1.5,2,3,5', help='price_change_threshold, %%')
+    parser.add_argument('--volumes', default='0,10M,50M,100M,500M', help='volume_filter (оборот 24ч, USDT)')
+    parser.add_argument('--horizons', default='1,5,15', help='горизонты форвардной доходности, свечей')
+    parser.add_argument('--csv', help='сохранить таблицу в CSV')
+    parser.add_argument('--download', type=int, metavar='DAYS', help='сначала догрузить историю за DAYS суток')
+    parser.add_argument('--top', type=int, default=300, help='для --download без --symbols: топ по обороту 24ч')
+    args = parser.parse_args()
+    if args.download and os.path.realpath(args.data_dir) == os.path.realpath(live_dir):
+        parser.error(f"{args.data_dir} — хранилище бота, его файлы сжимаются до candle_store_rows свечей; "
+                     "для истории укажите другой --data-dir")
+
+    disk = DiskCandleStore(args.data_dir, max_rows=None)
+    symbols = args.symbols.split(',') if args.symbols else None
+    if args.download:
+        if symbols is None:
+            symbols = asyncio.run(top_symbols(args.top))
+        asyncio.run(download(disk, symbols, args.timeframe, args.download))
+    if symbols is None:
+        symbols = stored_symbols(disk, args.timeframe) or stored_symbols(disk, '1m')
+    if not symbols:
+        log(f"Нет сохранённых свечей в {disk.root}", WARNING)
+        return
+
+    grid = Grid(
+        [float(v) for v in args.thresholds.split(',')],
+        [parse_human_number(v) for v in args.volumes.split(',')],
+        [int(v) for v in args.horizons.split(',')],
+        config,
+    )
+    started = time.perf_counter()
+    run(disk, symbols, args.timeframe, grid)
+    print(grid.report())
+    print(f"Время: {time.perf_counter() - started:.1f}с")
+    if args.csv:
+        grid.to_csv(args.csv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+# monitor/buffer.py
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from monitor.storage import ohlcv_view
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CandleBuffer:
+    """
+    Скользящее окно свечей фиксированного размера для одной пары (symbol, timeframe).
+    Данные лежат в массиве удвоенной длины: окно всегда непрерывный срез,
+    поэтому timestamps()/values() отдают NumPy view без копирования.
+    width — число колонок значений (по умолчанию OHLCV).
+    """
+
+    def __init__(self, capacity=200, width=len(OHLCV_COLUMNS)):
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._ohlcv = np.zeros((2 * capacity, width), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_ts(self):
+        """Время открытия последней свечи в мс или None."""
+        return int(self._ts[self._end - 1]) if len(self) else None
+
+    def update(self, ts, ohlcv):
+        """
+        Добавляет свечи (ts по возрастанию, ohlcv формы (n, width)).
+        Свеча с тем же временем, что и последняя, перезаписывается
+        (незакрытая свеча), более старые игнорируются.
+        Возвращает количество новых свечей.
+        """
+        ts = np.asarray(ts, dtype=np.int64)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64).reshape(len(ts), self._ohlcv.shape[1])
+        if not len(ts):
+            return 0
+
+        last = self.last_ts
+        if last is not None:
+            same = ts == last
+            if same.any():
+                self._ohlcv[self._end - 1] = ohlcv[same][-1]
+            newer = ts > last
+            ts, ohlcv = ts[newer], ohlcv[newer]
+
+        n = len(ts)
+        if n == 0:
+            return 0
+        if n >= self.capacity:
+            ts, ohlcv = ts[-self.capacity:], ohlcv[-self.capacity:]
+            self._ts[:self.capacity] = ts
+            self._ohlcv[:self.capacity] = ohlcv
+            self._start, self._end = 0, self.capacity
+            return n
+
+        if self._end + n > len(self._ts):
+            # Сдвигаем хвост окна в начало: амортизированно O(1) на свечу
+            keep = min(len(self), self.capacity - n)
+            self._ts[:keep] = self._ts[self._end - keep:self._end]
+            self._ohlcv[:keep] = self._ohlcv[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+
+        self._ts[self._end:self._end + n] = ts
+        self._ohlcv[self._end:self._end + n] = ohlcv
+        self._end += n
+        self._start = max(self._start, self._end - self.capacity)
+        return n
+
+    def _slice(self, n):
+        start = self._start if n is None else max(self._start, self._end - n)
+        return slice(start, self._end)
+
+    def timestamps(self, n=None):
+        """View последних n временных меток (мс)."""
+        return self._ts[self._slice(n)]
+
+    def values(self, n=None):
+        """View последних n строк OHLCV формы (n, 5)."""
+        return self._ohlcv[self._slice(n)]
+
+    def column(self, name, n=None):
+        """View одной колонки (open/high/low/close/volume)."""
+        return self._ohlcv[self._slice(n), OHLCV_COLUMNS.index(name)]
+
+    def to_frame(self, n=None, until=None):
+        """
+        DataFrame timestamp + OHLCV (копия данных).
+        until — только свечи, открытые раньше этого времени (мс).
+        """
+        ts, ohlcv = self.timestamps(), self.values()
+        end = len(ts) if until is None else int(np.searchsorted(ts, until))
+        start = 0 if n is None else max(0, end - n)
+        df = pd.DataFrame(ohlcv[start:end].copy(), columns=OHLCV_COLUMNS)
+        df.insert(0, 'timestamp', pd.to_datetime(ts[start:end], unit='ms'))
+        return df
+
+
+class CandleStore:
+    """
+    Набор буферов по ключу (symbol, timeframe) с ограничением числа серий:
+    при превышении max_series вытесняется самая давно использованная.
+    Если задан disk (DiskCandleStore), новый буфер лениво заполняется с диска,
+    а update() дописывает полученные свечи в файл.
+    capacities — длина буфера для отдельных таймфреймов (например, 1m, из которого
+    считаются старшие таймфреймы); буфер меньшей длины расширяется при обращении.
+    """
+
+    def __init__(self, capacity=200, max_series=3000, disk=None):
+        self.capacity = capacity
+        self.capacities = {}
+        self.max_series = max_series
+        self.disk = disk
+        self._buffers = OrderedDict()
+
+    def capacity_for(self, timeframe):
+        return self.capacities.get(timeframe, self.capacity)
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def get(self, symbol, timeframe):
+        buf = self._buffers.get((symbol, timeframe))
+        if buf is not None:
+            self._buffers.move_to_end((symbol, timeframe))
+        return buf
+
+    def buffer(self, symbol, timeframe):
+        buf = self.get(symbol, timeframe)
+        capacity = self.capacity_for(timeframe)
+        if buf is not None and buf.capacity < capacity:
+            resized = self._buffers[(symbol, timeframe)] = CandleBuffer(capacity)
+            resized.update(buf.timestamps(), buf.values())
+            buf = resized
+        if buf is None:
+            buf = self._buffers[(symbol, timeframe)] = CandleBuffer(capacity)
+            while len(self._buffers) > self.max_series:
+                self._buffers.popitem(last=False)
+            if self.disk is not None:
+                rows = self.disk.load(symbol, timeframe, capacity)
+                if len(rows):
+                    buf.update(rows['timestamp'], ohlcv_view(rows))
+        return buf
+
+    def update(self, symbol, timeframe, ts, ohlcv):
+        """Обновляет буфер свечами и сохраняет их на диск. Возвращает буфер."""
+        buf = self.buffer(symbol, timeframe)
+        ts = np.asarray(ts, dtype=np.int64)
+        ohlcv = np.asarray(ohlcv, dtype=np.float64).reshape(len(ts), len(OHLCV_COLUMNS))
+        last = buf.last_ts
+        buf.update(ts, ohlcv)
+        if self.disk is not None and len(ts):
+            fresh = ts >= last if last is not None else slice(None)
+            self.disk.append(symbol, timeframe, ts[fresh], ohlcv[fresh])
+        return buf
+
+    def stack(self, symbols, timeframe, column, n, until=None):
+        """
+        Матрица (len(symbols), n) последних n значений колонки по символам.
+        until — учитывать только свечи, открытые раньше этого времени (мс),
+        например чтобы отбросить незакрытую свечу. Короткие серии дополняются слева NaN.
+        """
+        out = np.full((len(symbols), n), np.nan)
+        for i, symbol in enumerate(symbols):
+            buf = self._buffers.get((symbol, timeframe))
+            if buf is None or not len(buf):
+                continue
+            ts = buf.timestamps()
+            end = len(ts) if until is None else int(np.searchsorted(ts, until))
+            values = buf.column(column)[max(0, end - n):end]
+            out[i, n - len(values):] = values
+        return out
+
+    def keys(self):
+        """Ключи (symbol, timeframe) буферов в памяти."""
+        return list(self._buffers)
+
+    def retain(self, symbols):
+        """Удаляет буферы символов, которых больше нет в списке (делистинг)."""
+        symbols = set(symbols)
+        stale = [key for key in self._buffers if key[0] not in symbols]
+        for key in stale:
+            del self._buffers[key]
+        return len(stale)
+
+
+store = CandleStore()
@@ -4,56 +4,68 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import mplfinance as mpf
-from monitor.logger import log
+from monitor.indicators import INDICATOR_COLUMNS
+from monitor.logger import log, DEBUG, ERROR
 import talib
 import traceback
 
 
-def create_chart(df_plot, symbol, timeframe='5m'):
+def compute_indicators(df_plot, symbol):
+    """MACD, RSI и Bollinger через TA-Lib по всей серии close (колонки добавляются в df_plot)."""
+    # --- MACD ---
+    try:
+        macd_line, signal_line, macd_hist = talib.MACD(
+            df_plot['close'].values, fastperiod=12, slowperiod=26, signalperiod=9
+        )
+        df_plot['macd'] = macd_line
+        df_plot['signal'] = signal_line
+        df_plot['macd_hist'] = macd_hist
+    except Exception as e:
+        log(f"Ошибка MACD для {symbol}: {e}", ERROR)
+        df_plot['macd'] = df_plot['signal'] = df_plot['macd_hist'] = np.nan
+
+    # --- RSI ---
+    try:
+        df_plot['rsi'] = talib.RSI(df_plot['close'].values, timeperiod=14)
+    except Exception as e:
+        log(f"Ошибка RSI для {symbol}: {e}", ERROR)
+        df_plot['rsi'] = np.nan
+
+    # --- Bollinger Bands ---
+    try:
+        upper, middle, lower = talib.BBANDS(
+            df_plot['close'].values, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0
+        )
+        df_plot['sma20'] = middle
+        df_plot['upper'] = upper
+        df_plot['lower'] = lower
+    except Exception as e:
+        log(f"Ошибка Bollinger для {symbol}: {e}", ERROR)
+        df_plot['sma20'] = df_plot['upper'] = df_plot['lower'] = np.nan
+
+
+def create_chart(df_plot, symbol, timeframe='5m', indicators=None):
     """
     Создаёт график: свечи + MACD + RSI + Bollinger + Фибоначчи слева.
     ADX УДАЛЁН.
+    indicators — готовые значения из monitor.indicators (колонка -> массив длины
+    df_plot); если не переданы, считаются через TA-Lib.
     Возвращает BytesIO буфер с PNG.
     """
     try:
-        log(f"Создание графика для {symbol}, свечей: {len(df_plot)}")
+        log(f"Создание графика для {symbol}, свечей: {len(df_plot)}", DEBUG)
         if len(df_plot) < 2:
-            log(f"Недостаточно данных для графика {symbol}")
+            log(f"Недостаточно данных для графика {symbol}", DEBUG)
             return None
 
         df_plot = df_plot.copy()
         df_plot.index = pd.to_datetime(df_plot['timestamp'])
 
-        # --- MACD ---
-        try:
-            macd_line, signal_line, macd_hist = talib.MACD(
-                df_plot['close'].values, fastperiod=12, slowperiod=26, signalperiod=9
-            )
-            df_plot['macd'] = macd_line
-            df_plot['signal'] = signal_line
-            df_plot['macd_hist'] = macd_hist
-        except Exception as e:
-            log(f"Ошибка MACD для {symbol}: {e}")
-            df_plot['macd'] = df_plot['signal'] = df_plot['macd_hist'] = np.nan
-
-        # --- RSI ---
-        try:
-            df_plot['rsi'] = talib.RSI(df_plot['close'].values, timeperiod=14)
-        except Exception as e:
-            log(f"Ошибка RSI для {symbol}: {e}")
-            df_plot['rsi'] = np.nan
-
-        # --- Bollinger Bands ---
-        try:
-            upper, middle, lower = talib.BBANDS(
-                df_plot['close'].values, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0
-            )
-            df_plot['sma20'] = middle
-            df_plot['upper'] = upper
-            df_plot['lower'] = lower
-        except Exception as e:
-            log(f"Ошибка Bollinger для {symbol}: {e}")
-            df_plot['sma20'] = df_plot['upper'] = df_plot['lower'] = np.nan
+        if indicators is not None:
+            for name in INDICATOR_COLUMNS:
+                df_plot[name] = np.asarray(indicators[name], dtype=float)
+        else:
+            compute_indicators(df_plot, symbol)
 
         add_plots = []
 
@@ -131,11 +143,11 @@ def create_chart(df_plot, symbol, timeframe='5m'):
         fig.savefig(buf, format='png', bbox_inches='tight', dpi=120, facecolor='white')
         plt.close('all')
         buf.seek(0)
-        log(f"График {symbol} создан (без ADX)")
+        log(f"График {symbol} создан (без ADX)", DEBUG)
         return buf
 
     except Exception as e:
-        log(f"КРИТИЧЕСКАЯ ОШИБКА в create_chart({symbol}): {e}")
-        log(f"Traceback: {traceback.format_exc()}")
+        log(f"КРИТИЧЕСКАЯ ОШИБКА в create_chart({symbol}): {e}", ERROR)
+        log(f"Traceback: {traceback.format_exc()}", ERROR)
         plt.close('all')
         return None
\ No newline at end of file
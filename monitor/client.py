@@ -0,0 +1,79 @@
+# monitor/client.py
+import asyncio
+import aiohttp
+from monitor.logger import log, WARNING
+from monitor.parser import loads
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    Долгоживущий HTTP-клиент с общим пулом соединений (keep-alive, DNS-кэш,
+    лимиты на хост, таймауты, повторы с экспоненциальной задержкой).
+    Создаётся один раз при старте бота и закрывается при остановке.
+    observers — функции observer(status, headers), вызываемые после каждого ответа
+    (например, WeightLimiter.observe).
+    """
+
+    def __init__(self, limit=100, limit_per_host=30, ttl_dns_cache=300,
+                 keepalive_timeout=60, total_timeout=15, connect_timeout=5,
+                 retries=3, backoff=0.5):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.observers = []
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def start(self):
+        # Сессия создаётся внутри работающего event loop
+        return self.session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_json(self, url, params=None):
+        """
+        GET-запрос с повторами при сетевых ошибках и 5xx.
+        На 429 ждёт Retry-After, 418 (бан IP) не повторяет.
+        Возвращает распарсенный JSON или бросает последнее исключение.
+        """
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                async with self.session.get(url, params=params) as resp:
+                    for observer in self.observers:
+                        observer(resp.status, resp.headers)
+                    retry_after = resp.headers.get('Retry-After')
+                    resp.raise_for_status()
+                    return loads(await resp.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                log(f"Повтор запроса {url} через {delay:.1f}с ({attempt + 1}/{self.retries}): {e}", WARNING)
+                await asyncio.sleep(delay)
+
+
+client = HttpClient()
@@ -0,0 +1,202 @@
+# monitor/dispatcher.py
+import asyncio
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter, TelegramError
+from monitor.logger import log, WARNING, ERROR
+from monitor.metrics import stage_seconds
+
+MAX_MESSAGE_LENGTH = 4096
+MERGE_SEPARATOR = "\n\n—————\n\n"
+
+
+class Message(NamedTuple):
+    chat_id: str
+    text: str
+    photo: Optional[bytes] = None
+    symbol: Optional[str] = None
+    attempts: int = 0
+
+
+def _seconds(retry_after):
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+class SignalDispatcher:
+    """
+    Единственный долгоживущий отправитель сигналов в Telegram.
+    submit() только кладёт сообщение в очередь, поэтому сканирование не ждёт Telegram.
+    Фоновая задача соблюдает лимиты (chat_interval секунд на чат, global_rate сообщений
+    в секунду на бота), повторяет отправку после RetryAfter и с backoff при сетевых
+    ошибках (пачка возвращается в очередь чата, остальные чаты не ждут), а подряд идущие
+    текстовые сигналы в один чат склеивает (до merge_limit).
+    Кулдаун не даёт повторно слать сигнал по той же монете чаще cooldown секунд.
+    """
+
+    def __init__(self, bot=None, chat_interval=3.0, global_rate=25, cooldown=900,
+                 merge_limit=5, max_retries=5, max_queue=1000):
+        self.bot = bot
+        self.chat_interval = chat_interval
+        self.global_interval = 1.0 / global_rate
+        self.cooldown = cooldown
+        self.merge_limit = merge_limit
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self.sent = 0
+        self.dropped = 0
+        self._queues = {}
+        self._next_chat_send = {}
+        self._next_global_send = 0.0
+        self._last_signal = {}
+        self._wakeup = None
+        self._task = None
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    # --- кулдаун ---
+    def on_cooldown(self, key):
+        last = self._last_signal.get(key)
+        return last is not None and time.monotonic() - last < self.cooldown
+
+    def mark(self, key):
+        now = time.monotonic()
+        self._last_signal[key] = now
+        if len(self._last_signal) > 10_000:
+            self._last_signal = {k: t for k, t in self._last_signal.items() if now - t < self.cooldown}
+
+    # --- очередь ---
+    def submit(self, chat_id, text, photo=None, symbol=None):
+        """Ставит сообщение в очередь без ожидания. False, если очередь переполнена."""
+        if len(self) >= self.max_queue:
+            self.dropped += 1
+            log(f"Очередь Telegram переполнена, сигнал {symbol} отброшен", WARNING)
+            return False
+        self._queues.setdefault(str(chat_id), deque()).append(Message(str(chat_id), text, photo, symbol))
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            if len(self):
+                self._wakeup.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10):
+        """Пытается дослать очередь за timeout секунд, затем останавливает задачу."""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while len(self) and time.monotonic() < deadline and not self._task.done():
+            await asyncio.sleep(0.1)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def _next_batch(self):
+        """Выбирает чат, которому уже можно писать; возвращает (chat_id, messages) или задержку."""
+        now = time.monotonic()
+        ready, wait = None, None
+        for chat_id, queue in self._queues.items():
+            if not queue:
+                continue
+            delay = self._next_chat_send.get(chat_id, 0) - now
+            if delay <= 0:
+                ready = chat_id
+                break
+            wait = delay if wait is None else min(wait, delay)
+        if ready is None:
+            return None, wait
+
+        queue = self._queues[ready]
+        batch = [queue.popleft()]
+        if batch[0].photo is None:
+            length = len(batch[0].text)
+            while (queue and queue[0].photo is None and len(batch) < self.merge_limit
+                   and length + len(MERGE_SEPARATOR) + len(queue[0].text) <= MAX_MESSAGE_LENGTH):
+                length += len(MERGE_SEPARATOR) + len(queue[0].text)
+                batch.append(queue.popleft())
+        if not queue:
+            del self._queues[ready]
+        return ready, batch
+
+    async def _run(self):
+        while True:
+            chat_id, batch = self._next_batch()
+            if chat_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), batch)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            pause = self._next_global_send - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            try:
+                await self._send(chat_id, batch)
+            except Exception as e:
+                log(f"Ошибка отправки в {chat_id}: {e}", ERROR)
+            now = time.monotonic()
+            self._next_global_send = now + self.global_interval
+            self._next_chat_send[chat_id] = max(self._next_chat_send.get(chat_id, 0), now + self.chat_interval)
+
+    def _requeue(self, chat_id, batch):
+        """Возвращает пачку в начало очереди чата; _run тем временем обслуживает другие чаты."""
+        if batch[0].attempts >= self.max_retries:
+            self.dropped += len(batch)
+            log(f"[{', '.join(m.symbol or '?' for m in batch)}] Сигнал не отправлен после "
+                f"{self.max_retries} попыток", WARNING)
+            return
+        queue = self._queues.setdefault(chat_id, deque())
+        queue.extendleft(reversed([m._replace(attempts=m.attempts + 1) for m in batch]))
+
+    async def _send(self, chat_id, batch):
+        message = batch[0]
+        text = MERGE_SEPARATOR.join(m.text for m in batch)
+        symbols = ", ".join(m.symbol or '?' for m in batch)
+        photo = message.photo
+
+        # Повтор не ждёт на месте: пачка возвращается в очередь чата с дедлайном в
+        # _next_chat_send, а _run тем временем обслуживает остальные чаты
+        while True:
+            try:
+                if photo:
+                    with stage_seconds.time(stage='send'):
+                        await self.bot.send_photo(chat_id=chat_id, photo=photo, caption=text, parse_mode="HTML")
+                    log(f"[{symbols}] Сигнал + график отправлены")
+                else:
+                    with stage_seconds.time(stage='send'):
+                        await self.bot.send_message(
+                            chat_id=chat_id, text=text, parse_mode="HTML", disable_web_page_preview=True
+                        )
+                    log(f"[{symbols}] Сигнал отправлен (без графика)")
+                self.sent += len(batch)
+                return
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                log(f"Telegram RetryAfter {delay:.0f}с для {chat_id}", WARNING)
+            except ChatMigrated as e:
+                # Группа стала супергруппой: старый chat_id больше не принимает сообщения
+                self.dropped += len(batch)
+                log(f"[{symbols}] Чат {chat_id} перенесён в {e.new_chat_id}, сигнал не отправлен", WARNING)
+                return
+            except Forbidden:
+                raise
+            except BadRequest as e:
+                if not photo:
+                    raise
+                # Например, подпись длиннее 1024 символов — шлём без графика
+                log(f"Ошибка отправки графика {symbols}: {e}, отправка текстом", ERROR)
+                photo = None
+                continue
+            except TelegramError as e:
+                delay = min(2 ** message.attempts, 60)
+                log(f"Ошибка Telegram {symbols}: {e}, повтор через {delay}с", ERROR)
+            self._next_chat_send[chat_id] = time.monotonic() + delay
+            self._requeue(chat_id, [message._replace(photo=photo)] + batch[1:])
+            return
@@ -0,0 +1,174 @@
+# monitor/fast_chart.py
+import io
+import numpy as np
+import talib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+from monitor.indicators import INDICATOR_COLUMNS
+
+UP_COLOR = '#26a69a'
+DOWN_COLOR = '#ef5350'
+FIB_RATIOS = [0.0, 0.236, 0.382, 0.5, 0.618, 1.0]
+BODY_WIDTH = 0.35
+
+_templates = {}
+
+
+def _bars(x, bottom, top):
+    """Вершины прямоугольников (n, 4, 2) для PolyCollection."""
+    verts = np.empty((len(x), 4, 2))
+    verts[:, 0, 0] = verts[:, 1, 0] = x - BODY_WIDTH
+    verts[:, 2, 0] = verts[:, 3, 0] = x + BODY_WIDTH
+    verts[:, 0, 1] = verts[:, 3, 1] = bottom
+    verts[:, 1, 1] = verts[:, 2, 1] = top
+    return verts
+
+
+def _limits(*arrays, pad=0.05):
+    values = np.concatenate([np.asarray(a, dtype=np.float64).ravel() for a in arrays])
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return -1.0, 1.0
+    lo, hi = values.min(), values.max()
+    margin = (hi - lo) * pad or abs(hi) * pad or 1.0
+    return lo - margin, hi + margin
+
+
+class ChartTemplate:
+    """
+    Быстрый рендерер: раскладка панелей (свечи + Bollinger + Фибоначчи, RSI, MACD, объём)
+    строится один раз на Agg-холсте, а для каждого символа обновляются только данные артистов.
+    """
+
+    def __init__(self, figsize=(14, 10), dpi=120):
+        self.dpi = dpi
+        self.fig = Figure(figsize=figsize, dpi=dpi, facecolor='white')
+        self.canvas = FigureCanvasAgg(self.fig)
+        gs = self.fig.add_gridspec(4, 1, height_ratios=[5, 1, 1, 1.5], hspace=0.08)
+        self.ax_price = self.fig.add_subplot(gs[0])
+        self.ax_rsi = self.fig.add_subplot(gs[1], sharex=self.ax_price)
+        self.ax_macd = self.fig.add_subplot(gs[2], sharex=self.ax_price)
+        self.ax_vol = self.fig.add_subplot(gs[3], sharex=self.ax_price)
+        self.fig.subplots_adjust(left=0.04, right=0.92, top=0.95, bottom=0.05)
+        self._timestamps = np.empty(0, dtype=np.int64)
+
+        for ax in (self.ax_price, self.ax_rsi, self.ax_macd, self.ax_vol):
+            ax.yaxis.tick_right()
+            ax.yaxis.set_label_position('right')
+            ax.grid(True, linestyle=':', alpha=0.4)
+        for ax in (self.ax_price, self.ax_rsi, self.ax_macd):
+            ax.tick_params(labelbottom=False)
+        self.ax_vol.xaxis.set_major_locator(MaxNLocator(8, integer=True))
+        self.ax_vol.xaxis.set_major_formatter(FuncFormatter(self._format_x))
+        self.ax_price.set_ylabel('Price (USDT)')
+        self.ax_rsi.set_ylabel('RSI')
+        self.ax_vol.set_ylabel('Volume')
+
+        # --- Свечи, Bollinger, Фибоначчи ---
+        self.wicks = LineCollection([], linewidths=0.8)
+        self.bodies = PolyCollection([], linewidths=0.5)
+        self.ax_price.add_collection(self.wicks)
+        self.ax_price.add_collection(self.bodies)
+        self.sma20, = self.ax_price.plot([], [], color='orange', linestyle='--', linewidth=1)
+        self.upper, = self.ax_price.plot([], [], color='purple', linestyle=':', linewidth=0.8)
+        self.lower, = self.ax_price.plot([], [], color='purple', linestyle=':', linewidth=0.8)
+        transform = self.ax_price.get_yaxis_transform()
+        self.fib_lines = [
+            self.ax_price.axhline(0, color='purple', linestyle='--', linewidth=1.2, alpha=0.7)
+            for _ in FIB_RATIOS
+        ]
+        self.fib_labels = [
+            self.ax_price.text(0.02, 0, '', fontsize=8, color='purple', fontweight='bold',
+                               va='center', ha='left', transform=transform,
+                               bbox=dict(boxstyle="round,pad=0.2", facecolor='white', alpha=0.8))
+            for _ in FIB_RATIOS
+        ]
+        self.title = self.ax_price.set_title('')
+
+        # --- RSI ---
+        self.rsi, = self.ax_rsi.plot([], [], color='blue', linewidth=1)
+        self.ax_rsi.axhline(70, color='gray', linestyle='--', linewidth=0.6)
+        self.ax_rsi.axhline(30, color='gray', linestyle='--', linewidth=0.6)
+        self.ax_rsi.set_ylim(0, 100)
+
+        # --- MACD ---
+        self.macd_hist = PolyCollection([], facecolors='gray', alpha=0.6)
+        self.ax_macd.add_collection(self.macd_hist)
+        self.macd, = self.ax_macd.plot([], [], color='#1f77b4', linewidth=1.0)
+        self.macd_signal, = self.ax_macd.plot([], [], color='#ff7f0e', linestyle='--', linewidth=1.0)
+
+        # --- Объём ---
+        self.volume = PolyCollection([], alpha=0.6)
+        self.ax_vol.add_collection(self.volume)
+
+    def _format_x(self, value, pos):
+        i = int(round(value))
+        if 0 <= i < len(self._timestamps):
+            return np.datetime_as_string(self._timestamps[i].astype('datetime64[ms]'), unit='m')[5:].replace('T', ' ')
+        return ''
+
+    def render(self, symbol, timeframe, timestamps, ohlcv, fmt='png', indicators=None):
+        """
+        Обновляет артистов данными символа и возвращает байты картинки (png/webp).
+        indicators — готовые значения из monitor.indicators, иначе считаются через TA-Lib.
+        """
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        o, h, l, c, v = ohlcv.T
+        n = len(c)
+        x = np.arange(n, dtype=np.float64)
+        self._timestamps = np.asarray(timestamps, dtype=np.int64)
+
+        if indicators is not None:
+            macd_line, signal_line, macd_hist, rsi, middle, upper, lower = (
+                np.asarray(indicators[name], dtype=np.float64) for name in INDICATOR_COLUMNS
+            )
+        else:
+            macd_line, signal_line, macd_hist = talib.MACD(c, fastperiod=12, slowperiod=26, signalperiod=9)
+            rsi = talib.RSI(c, timeperiod=14)
+            upper, middle, lower = talib.BBANDS(c, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+
+        colors = np.where(c >= o, UP_COLOR, DOWN_COLOR)
+        self.wicks.set_segments(np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1))
+        self.wicks.set_color(colors)
+        self.bodies.set_verts(_bars(x, o, c))
+        self.bodies.set_facecolor(colors)
+        self.bodies.set_edgecolor(colors)
+        self.sma20.set_data(x, middle)
+        self.upper.set_data(x, upper)
+        self.lower.set_data(x, lower)
+
+        fib_high, fib_low = np.nanmax(h), np.nanmin(l)
+        fib_diff = max(fib_high - fib_low, 1e-8)
+        price_decimals = max(4, -int(np.log10(abs(fib_high) or 1)) + 2) if fib_high > 0 else 8
+        for ratio, line, label in zip(FIB_RATIOS, self.fib_lines, self.fib_labels):
+            level = fib_high - ratio * fib_diff
+            line.set_ydata([level, level])
+            label.set_y(level)
+            label.set_text(f"{ratio*100:.1f}% — {level:.{price_decimals}f}")
+
+        self.rsi.set_data(x, rsi)
+        self.macd.set_data(x, macd_line)
+        self.macd_signal.set_data(x, signal_line)
+        self.macd_hist.set_verts(_bars(x, 0, np.nan_to_num(macd_hist)))
+        self.volume.set_verts(_bars(x, 0, v))
+        self.volume.set_facecolor(colors)
+
+        self.ax_price.set_xlim(-1, n)
+        self.ax_price.set_ylim(*_limits(l, h, upper, lower))
+        self.ax_macd.set_ylim(*_limits(macd_line, signal_line, macd_hist, [0]))
+        self.ax_vol.set_ylim(0, (np.nanmax(v) if n else 1) * 1.1 or 1)
+        self.title.set_text(f"{symbol} ({timeframe}) - {n} candles")
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format=fmt, dpi=self.dpi, facecolor='white')
+        return buf.getvalue()
+
+
+def render_fast(symbol, timeframe, timestamps, ohlcv, dpi=120, fmt='png', indicators=None):
+    """Рендер через закэшированный шаблон (один на процесс и разрешение)."""
+    template = _templates.get(dpi)
+    if template is None:
+        template = _templates[dpi] = ChartTemplate(dpi=dpi)
+    return template.render(symbol, timeframe, timestamps, ohlcv, fmt=fmt, indicators=indicators)
@@ -1,75 +1,54 @@
 # monitor/fetcher.py
-import aiohttp
-import pandas as pd
-from monitor.logger import log
+import time
+from monitor.buffer import store
+from monitor.client import client
+from monitor.logger import log, ERROR
+from monitor.metrics import stage_seconds
+from monitor.parser import parse_klines
+from monitor.storage import ohlcv_view
+from monitor.screener import parse_ticker_stats
 
 BINANCE_FAPI = "https://fapi.binance.com/fapi/v1"
 
-async def get_all_futures_tickers():
+interval_map = {'1m':'1m', '5m':'5m', '15m':'15m', '30m':'30m', '1h':'1h', '4h':'4h'}
+interval_ms = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000, '1h': 3_600_000, '4h': 14_400_000}
+
+async def get_ticker_stats():
+    """Статистика 24hr по всем USDT-фьючерсам (список TickerStats)."""
     try:
         url = f"{BINANCE_FAPI}/ticker/24hr"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                data = await resp.json()
-                tickers = [item['symbol'] for item in data if item['symbol'].endswith('USDT')]
-                log(f"Всего тикеров: {len(tickers)}")
-                return tickers
+        with stage_seconds.time(stage='tickers'):
+            data = await client.get_json(url)
+        with stage_seconds.time(stage='parse'):
+            stats = parse_ticker_stats(data)
+        log(f"Всего тикеров: {len(stats)}")
+        return stats
     except Exception as e:
-        log(f"Ошибка получения тикеров: {e}")
+        log(f"Ошибка получения тикеров: {e}", ERROR)
         return []
 
-async def fetch_ohlcv_binance(symbol, timeframe='1m', limit=100):
-    interval_map = {'1m':'1m', '5m':'5m', '15m':'15m'}
-    interval = interval_map.get(timeframe,'1m')
-    url = f"{BINANCE_FAPI}/klines"
-    params = {"symbol":symbol, "interval":interval, "limit":limit}
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                data = await resp.json()
-                if not data:
-                    log(f"{symbol} - данные OHLCV пусты")
-                    return pd.DataFrame()
-                df = pd.DataFrame(data, columns=['timestamp','open','high','low','close','volume',
-                                                 'close_time','quote_asset_volume','num_trades',
-                                                 'taker_buy_base','taker_buy_quote','ignore'])
-                df = df[['timestamp','open','high','low','close','volume']]
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df[['open','high','low','close','volume']] = df[['open','high','low','close','volume']].astype(float)
-                return df
-    except Exception as e:
-        log(f"Ошибка получения OHLCV для {symbol}: {e}")
-        return pd.DataFrame()
-
-# === НОВАЯ ФУНКЦИЯ ДЛЯ ГРАФИКА ===
-async def fetch_ohlcv_chart(symbol, timeframe='1m', max_limit=200):
+async def update_candles(symbol, timeframe='1m'):
     """
-    Получает до 200 свечей для построения графика.
+    Догружает в буфер только свечи новее последней сохранённой
+    (startTime = время последней свечи, она могла ещё не закрыться).
+    Пустой или слишком отставший буфер заполняется целиком. Возвращает буфер.
     """
-    interval_map = {'1m':'1m', '5m':'5m', '15m':'15m'}
     interval = interval_map.get(timeframe, '1m')
-    url = f"{BINANCE_FAPI}/klines"
-    params = {"symbol": symbol, "interval": interval, "limit": max_limit}
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                data = await resp.json()
-                if not data:
-                    log(f"{symbol} - пустые данные (chart)")
-                    return pd.DataFrame()
+    buf = store.buffer(symbol, timeframe)
+    params = {"symbol": symbol, "interval": interval, "limit": buf.capacity}
+    if buf.last_ts is not None:
+        gap = int((time.time() * 1000 - buf.last_ts) // interval_ms[interval])
+        if gap < buf.capacity:
+            # limit < 100 стоит 1 единицу веса вместо 2
+            params["startTime"] = buf.last_ts
+            params["limit"] = gap + 2
 
-                df = pd.DataFrame(data, columns=[
-                    'timestamp','open','high','low','close','volume',
-                    'close_time','quote_asset_volume','num_trades',
-                    'taker_buy_base','taker_buy_quote','ignore'
-                ])
-                df = df[['timestamp','open','high','low','close','volume']]
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                df[['open','high','low','close','volume']] = df[['open','high','low','close','volume']].astype(float)
-                log(f"[{symbol}] Получено {len(df)} свечей для графика")
-                return df
-    except Exception as e:
-        log(f"Ошибка получения графика для {symbol}: {e}")
-        return pd.DataFrame()
+    with stage_seconds.time(stage='klines'):
+        data = await client.get_json(f"{BINANCE_FAPI}/klines", params=params)
+    if data:
+        with stage_seconds.time(stage='parse'):
+            rows = parse_klines(data)
+        # Буфер в памяти и дозапись на диск — отдельная стадия, не parse
+        with stage_seconds.time(stage='store'):
+            buf = store.update(symbol, timeframe, rows['timestamp'], ohlcv_view(rows))
+    return buf
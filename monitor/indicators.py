@@ -0,0 +1,248 @@
+# monitor/indicators.py
+import math
+import numpy as np
+from monitor.buffer import CandleBuffer
+
+NAN = float('nan')
+INDICATOR_COLUMNS = ['macd', 'signal', 'macd_hist', 'rsi', 'sma20', 'upper', 'lower']
+
+
+class EMA:
+    """EMA как в TA-Lib: затравка — SMA первых period значений, далее k = 2 / (period + 1)."""
+
+    __slots__ = ('period', 'k', 'count', 'total', 'value')
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def _next(self, x):
+        count = self.count + 1
+        if count < self.period:
+            return count, self.total + x, NAN
+        if count == self.period:
+            total = self.total + x
+            return count, total, total / self.period
+        return count, self.total, (x - self.value) * self.k + self.value
+
+    def update(self, x):
+        self.count, self.total, self.value = self._next(x)
+        return self.value
+
+    def peek(self, x):
+        return self._next(x)[2]
+
+
+class RSI:
+    """RSI Уайлдера как в TA-Lib: первые средние — простые за period изменений."""
+
+    __slots__ = ('period', 'prev', 'count', 'gain', 'loss')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev = None
+        self.count = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def _next(self, x):
+        if self.prev is None:
+            return 0, 0.0, 0.0, NAN
+        diff = x - self.prev
+        up, down = max(diff, 0.0), max(-diff, 0.0)
+        count, p = self.count + 1, self.period
+        if count < p:
+            return count, self.gain + up, self.loss + down, NAN
+        if count == p:
+            gain, loss = (self.gain + up) / p, (self.loss + down) / p
+        else:
+            gain, loss = (self.gain * (p - 1) + up) / p, (self.loss * (p - 1) + down) / p
+        total = gain + loss
+        return count, gain, loss, (100.0 * gain / total) if total else 0.0
+
+    def update(self, x):
+        self.count, self.gain, self.loss, value = self._next(x)
+        self.prev = x
+        return value
+
+    def peek(self, x):
+        return self._next(x)[3]
+
+
+class RollingStats:
+    """
+    Скользящие среднее и дисперсия (генеральная, как TA_STDDEV) за O(1):
+    суммы x и x² по окну; при каждом обороте кольца суммы пересчитываются
+    точно, чтобы не копилась ошибка округления.
+    """
+
+    __slots__ = ('period', 'window', 'pos', 'count', 'total', 'total_sq')
+
+    def __init__(self, period=20):
+        self.period = period
+        self.window = np.zeros(period)
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def _stats(self, total, total_sq):
+        mean = total / self.period
+        return mean, max(total_sq / self.period - mean * mean, 0.0)
+
+    def update(self, x):
+        old = self.window[self.pos] if self.count >= self.period else 0.0
+        self.window[self.pos] = x
+        self.pos = (self.pos + 1) % self.period
+        self.count += 1
+        if self.pos == 0:
+            self.total = float(self.window.sum())
+            self.total_sq = float(np.dot(self.window, self.window))
+        else:
+            self.total += x - old
+            self.total_sq += x * x - old * old
+        if self.count < self.period:
+            return NAN, NAN
+        return self._stats(self.total, self.total_sq)
+
+    def peek(self, x):
+        if self.count + 1 < self.period:
+            return NAN, NAN
+        old = self.window[self.pos] if self.count >= self.period else 0.0
+        return self._stats(self.total + x - old, self.total_sq + x * x - old * old)
+
+
+class MACD:
+    """
+    MACD как в TA-Lib: быстрая EMA стартует на slow - fast значений позже,
+    чтобы обе EMA получили первое значение на одной свече; сигнальная — EMA от MACD.
+    """
+
+    __slots__ = ('skip', 'count', 'fast', 'slow', 'signal')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.skip = slow - fast
+        self.count = 0
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def _macd(self, fast, slow, signal_fn):
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+        macd = fast - slow
+        signal = signal_fn(macd)
+        # TA-Lib не отдаёт MACD, пока не готова сигнальная линия
+        if math.isnan(signal):
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+    def update(self, x):
+        fast = self.fast.update(x) if self.count >= self.skip else NAN
+        self.count += 1
+        return self._macd(fast, self.slow.update(x), self.signal.update)
+
+    def peek(self, x):
+        fast = self.fast.peek(x) if self.count >= self.skip else NAN
+        return self._macd(fast, self.slow.peek(x), self.signal.peek)
+
+
+class IndicatorState:
+    """MACD(12,26,9), RSI(14) и Bollinger(20, 2σ) одной серии с историей значений."""
+
+    def __init__(self, capacity=200, bb_period=20, bb_dev=2.0):
+        self.macd = MACD()
+        self.rsi = RSI()
+        self.bb = RollingStats(bb_period)
+        self.bb_dev = bb_dev
+        self.last_ts = None
+        self.history = CandleBuffer(capacity, width=len(INDICATOR_COLUMNS))
+
+    def _row(self, macd, rsi, stats):
+        mean, var = stats
+        dev = self.bb_dev * math.sqrt(var) if not math.isnan(var) else NAN
+        return (*macd, rsi, mean, mean + dev, mean - dev)
+
+    def update(self, ts, close):
+        row = self._row(self.macd.update(close), self.rsi.update(close), self.bb.update(close))
+        self.last_ts = ts
+        self.history.update([ts], [row])
+        return row
+
+    def peek(self, close):
+        return self._row(self.macd.peek(close), self.rsi.peek(close), self.bb.peek(close))
+
+
+class IndicatorEngine:
+    """
+    Потоковые индикаторы по (symbol, timeframe): каждая новая закрытая свеча
+    обновляет состояние за O(1). Значения совпадают с TA-Lib, посчитанным по той же
+    последовательности свечей (с первой свечи, которую увидел движок).
+    """
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self._states = {}
+
+    def __len__(self):
+        return len(self._states)
+
+    def update(self, symbol, timeframe, timestamps, closes, until=None):
+        """
+        Скармливает движку закрытые свечи новее последней обработанной
+        (until — время открытия незакрытой свечи, мс). Если пропущены свечи,
+        которых уже нет в переданном окне, состояние пересобирается заново.
+        """
+        timestamps = np.asarray(timestamps)
+        end = len(timestamps) if until is None else int(np.searchsorted(timestamps, until))
+        if not end:
+            return self._states.get((symbol, timeframe))
+
+        state = self._states.get((symbol, timeframe))
+        if state is None or state.last_ts is None or state.last_ts < timestamps[0]:
+            state = self._states[(symbol, timeframe)] = IndicatorState(self.capacity)
+            start = 0
+        else:
+            start = int(np.searchsorted(timestamps, state.last_ts, side='right'))
+
+        for i in range(start, end):
+            state.update(int(timestamps[i]), float(closes[i]))
+        return state
+
+    def latest(self, symbols, timeframe):
+        """Последние значения по символам: dict колонка -> массив (len(symbols),)."""
+        out = np.full((len(symbols), len(INDICATOR_COLUMNS)), np.nan)
+        for i, symbol in enumerate(symbols):
+            state = self._states.get((symbol, timeframe))
+            if state is not None and len(state.history):
+                out[i] = state.history.values(1)[0]
+        return {name: out[:, j] for j, name in enumerate(INDICATOR_COLUMNS)}
+
+    def series(self, symbol, timeframe, timestamps, closes):
+        """
+        Значения индикаторов, выровненные по timestamps (для графика).
+        Свеча новее последней обработанной (незакрытая) считается через peek без
+        изменения состояния; свечей вне истории — NaN.
+        """
+        timestamps = np.asarray(timestamps)
+        out = np.full((len(timestamps), len(INDICATOR_COLUMNS)), np.nan)
+        state = self._states.get((symbol, timeframe))
+        if state is not None and len(state.history):
+            hist_ts = state.history.timestamps()
+            idx = np.searchsorted(hist_ts, timestamps)
+            found = (idx < len(hist_ts)) & (hist_ts[np.minimum(idx, len(hist_ts) - 1)] == timestamps)
+            out[found] = state.history.values()[idx[found]]
+            if len(timestamps) and timestamps[-1] > state.last_ts:
+                out[-1] = state.peek(float(closes[-1]))
+        return {name: out[:, j] for j, name in enumerate(INDICATOR_COLUMNS)}
+
+    def retain(self, symbols):
+        symbols = set(symbols)
+        for key in [key for key in self._states if key[0] not in symbols]:
+            del self._states[key]
+
+
+engine = IndicatorEngine()
@@ -1,4 +1,58 @@
+import atexit
+import logging
+import queue
+import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
-def log(msg):
-    print(f"[{datetime.now()}] {msg}")
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+FORMAT = "[%(asctime)s] %(levelname)s %(message)s"
+
+
+class _Formatter(logging.Formatter):
+    def formatTime(self, record, datefmt=None):
+        return str(datetime.fromtimestamp(record.created))
+
+
+logger = logging.getLogger('monitor')
+logger.propagate = False
+logger.setLevel(INFO)
+
+# Вызов log() только кладёт запись в очередь; форматирование и запись в stdout —
+# в фоновом потоке QueueListener, поэтому event loop не ждёт вывода
+_queue = queue.SimpleQueue()
+logger.addHandler(QueueHandler(_queue))
+_stream = logging.StreamHandler(sys.stdout)
+_stream.setFormatter(_Formatter(FORMAT))
+_listener = QueueListener(_queue, _stream)
+_listener.start()
+
+
+def shutdown():
+    """Досылает очередь логов и останавливает фоновый поток (перед выходом или os.execl)."""
+    if _listener._thread is not None:
+        _listener.stop()
+
+
+atexit.register(shutdown)
+
+
+def set_level(level):
+    """Уровень логирования: имя ('DEBUG', 'INFO', ...) или число."""
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def set_prefix(prefix):
+    """Префикс сообщений процесса (например, номер шарда у воркера сканирования)."""
+    _stream.setFormatter(_Formatter(FORMAT.replace('%(message)s', prefix.replace('%', '%%') + '%(message)s')))
+
+
+def is_enabled(level):
+    return logger.isEnabledFor(level)
+
+
+def log(msg, level=INFO):
+    logger.log(level, msg)
@@ -0,0 +1,312 @@
+# monitor/metrics.py
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from aiohttp import web
+from monitor.logger import log, WARNING, ERROR
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+STAGES = ['tickers', 'klines', 'parse', 'store', 'resample', 'analyze', 'render', 'send']
+
+
+def _key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Ожидались метки {labelnames}, получены {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + list(extra or [])
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{v}"' for (name, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._function = None
+
+    def set_function(self, fn):
+        """Значение берётся из fn() в момент экспорта (для метрик без меток)."""
+        self._function = fn
+
+    def drain(self):
+        """Забирает накопленные значения и обнуляет метрику (передача из воркера шарда)."""
+        values, self._values = self._values, {}
+        return values
+
+    def get(self, **labels):
+        if self._function is not None:
+            return self._function()
+        return self._values.get(_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        if self._function is not None:
+            yield self.name, (), float(self._function())
+            return
+        for key, value in sorted(self._values.items()):
+            yield self.name, key, value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, key, value, *extra in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, *extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _key(self.labelnames, labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values):
+        for key, amount in values.items():
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self._values[_key(self.labelnames, labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Гистограмма Prometheus с фиксированными границами; для сводки в боте
+    дополнительно держит последние recent наблюдений и считает по ним квантили.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, recent=500):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = np.asarray(buckets, dtype=np.float64)
+        self.recent = recent
+
+    def _series(self, key):
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = {
+                'counts': np.zeros(len(self.buckets) + 1, dtype=np.int64),
+                'sum': 0.0,
+                'recent': deque(maxlen=self.recent),
+            }
+        return series
+
+    def observe(self, value, **labels):
+        series = self._series(_key(self.labelnames, labels))
+        series['counts'][np.searchsorted(self.buckets, value)] += 1
+        series['sum'] += value
+        series['recent'].append(value)
+
+    def drain(self):
+        return {key: {**series, 'recent': list(series['recent'])} for key, series in super().drain().items()}
+
+    def merge(self, values):
+        """Добавляет наблюдения, снятые drain() с такой же гистограммы."""
+        for key, other in values.items():
+            series = self._series(key)
+            series['counts'] += other['counts']
+            series['sum'] += other['sum']
+            series['recent'].extend(other['recent'])
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._values.get(_key(self.labelnames, labels))
+        return int(series['counts'].sum()) if series else 0
+
+    def last(self, **labels):
+        series = self._values.get(_key(self.labelnames, labels))
+        return series['recent'][-1] if series and series['recent'] else None
+
+    def quantile(self, q, **labels):
+        """Квантиль по последним наблюдениям или None, если их нет."""
+        series = self._values.get(_key(self.labelnames, labels))
+        if not series or not series['recent']:
+            return None
+        return float(np.quantile(np.fromiter(series['recent'], dtype=np.float64), q))
+
+    def samples(self):
+        for key, series in sorted(self._values.items()):
+            cumulative = np.cumsum(series['counts'])
+            for bound, count in zip(self.buckets, cumulative):
+                yield f"{self.name}_bucket", key, count, [('le', f'{bound:g}')]
+            yield f"{self.name}_bucket", key, cumulative[-1], [('le', '+Inf')]
+            yield f"{self.name}_sum", key, series['sum']
+            yield f"{self.name}_count", key, cumulative[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.expose())
+            except Exception as e:
+                log(f"Ошибка экспорта метрики {metric.name}: {e}", ERROR)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+stage_seconds = registry.histogram(
+    'monitor_stage_seconds', 'Длительность стадий: tickers, klines, parse, store, resample, analyze, render, send', ['stage'])
+cycle_seconds = registry.histogram('monitor_cycle_seconds', 'Длительность цикла сканирования')
+cycles_total = registry.counter(
+    'monitor_cycles_total', 'Циклы сканирования: completed, skipped (предыдущий ещё идёт), missed', ['result'])
+cycle_overruns_total = registry.counter(
+    'monitor_cycle_overruns_total', 'Циклы, которые шли дольше интервала свечи')
+symbols_scanned = registry.gauge('monitor_symbols_scanned', 'Символов в последнем цикле')
+signals_total = registry.counter('monitor_signals_total', 'Сработавшие сигналы')
+api_requests_total = registry.counter('monitor_api_requests_total', 'Ответы Binance FAPI по HTTP-статусу', ['status'])
+api_weight_used = registry.gauge('monitor_api_weight_used_1m', 'Вес запросов за минуту (X-MBX-USED-WEIGHT-1M)')
+api_concurrency = registry.gauge('monitor_api_concurrency_limit', 'Текущий лимит параллельных запросов')
+telegram_sent = registry.counter('monitor_telegram_sent_total', 'Отправленные сообщения Telegram')
+telegram_dropped = registry.counter('monitor_telegram_dropped_total', 'Неотправленные сообщения Telegram')
+telegram_queue = registry.gauge('monitor_telegram_queue', 'Сообщений в очереди Telegram')
+shard_up = registry.gauge('monitor_shard_up', 'Воркер шарда сканирования ответил на последний цикл', ['shard'])
+shard_symbols = registry.gauge('monitor_shard_symbols', 'Тикеров на шарде', ['shard'])
+shard_scan_seconds = registry.gauge('monitor_shard_scan_seconds', 'Длительность последнего скана шарда', ['shard'])
+shard_restarts_total = registry.counter('monitor_shard_restarts_total', 'Перезапуски воркеров шардов', ['shard'])
+
+
+def observe_response(status, headers):
+    """Наблюдатель ответов HttpClient (client.observers)."""
+    api_requests_total.inc(status=status)
+    weight = headers.get('X-MBX-USED-WEIGHT-1M')
+    if weight is not None:
+        try:
+            api_weight_used.set(int(weight))
+        except ValueError:
+            pass
+
+
+def drain_shard():
+    """
+    Наблюдения стадий, ответы API и вес запросов, накопленные воркером шарда с прошлого
+    вызова; координатор добавляет их в свой реестр через merge_shards.
+    """
+    return {
+        'stages': stage_seconds.drain(),
+        'requests': api_requests_total.drain(),
+        'weight': api_weight_used.drain().get(()),
+    }
+
+
+def merge_shards(snapshots):
+    weights = []
+    for snapshot in snapshots:
+        stage_seconds.merge(snapshot['stages'])
+        api_requests_total.merge(snapshot['requests'])
+        if snapshot['weight'] is not None:
+            weights.append(snapshot['weight'])
+    # Вес считается на IP, общий для всех воркеров: самый свежий — наибольший за цикл
+    if weights:
+        api_weight_used.set(max(weights))
+
+
+def _ms(value):
+    return '—' if value is None else f"{value * 1000:.0f}"
+
+
+def _seconds(value):
+    return '—' if value is None else f"{value:.1f}с"
+
+
+def summary():
+    """Короткая сводка для ответа Status в боте."""
+    lines = [
+        f"Последний цикл: {_seconds(cycle_seconds.last())}"
+        f" (p50 {_seconds(cycle_seconds.quantile(0.5))}, p99 {_seconds(cycle_seconds.quantile(0.99))})",
+        f"Циклов: {cycles_total.get(result='completed')}, пропущено: {cycles_total.get(result='skipped')}"
+        f" + {cycles_total.get(result='missed')}, дольше свечи: {cycle_overruns_total.get()}",
+        "Стадии p50/p99, мс: " + ", ".join(
+            f"{stage} {_ms(stage_seconds.quantile(0.5, stage=stage))}/{_ms(stage_seconds.quantile(0.99, stage=stage))}"
+            for stage in STAGES
+        ),
+        f"Вес API: {api_weight_used.get()}/мин, 429: {api_requests_total.get(status=429)}, "
+        f"сигналов: {signals_total.get()}",
+    ]
+    return '\n'.join(lines)
+
+
+class MetricsServer:
+    """HTTP-сервер с /metrics (Prometheus) на порту контейнера."""
+
+    def __init__(self, port=80, host='0.0.0.0'):
+        self.port = port
+        self.host = host
+        self._runner = None
+
+    async def _metrics(self, request):
+        return web.Response(text=registry.expose(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def _health(self, request):
+        return web.Response(text='ok')
+
+    async def start(self):
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._metrics)
+        app.router.add_get('/', self._health)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            await runner.cleanup()
+            log(f"Не удалось открыть порт метрик {self.port}: {e}", WARNING)
+            return
+        self._runner = runner
+        log(f"Метрики: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
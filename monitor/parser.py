@@ -0,0 +1,30 @@
+# monitor/parser.py
+import json
+import numpy as np
+from monitor.storage import CANDLE_DTYPE
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него — стандартный json
+    orjson = None
+
+
+def loads(raw):
+    """JSON из bytes/str: orjson, если установлен, иначе json."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def parse_klines(data):
+    """
+    Ответ /fapi/v1/klines (список списков строк) -> массив CANDLE_DTYPE.
+    Берутся только open time и OHLCV, остальные 6 колонок не разбираются;
+    DataFrame не строится (он нужен только графику — CandleBuffer.to_frame).
+    """
+    if not data:
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    return np.array(
+        [(row[0], float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5])) for row in data],
+        dtype=CANDLE_DTYPE,
+    )
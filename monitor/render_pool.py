@@ -0,0 +1,131 @@
+# monitor/render_pool.py
+import asyncio
+import importlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from monitor.logger import log, WARNING, ERROR
+from monitor.metrics import stage_seconds
+
+
+def _warmup():
+    # Тяжёлые импорты делаются один раз при старте воркера, а не на каждый график
+    import matplotlib
+    matplotlib.use('Agg')
+    for name in ('mplfinance', 'talib', 'monitor.charts', 'monitor.fast_chart'):
+        importlib.import_module(name)
+
+
+def _ping():
+    return os.getpid()
+
+
+def render_png(symbol, timeframe, timestamps, ohlcv, renderer='mplfinance', dpi=120, fmt='png', indicators=None):
+    """
+    Выполняется в процессе-воркере: компактные массивы -> байты картинки (или None).
+    timestamps — int64 мс, ohlcv — float64 (n, 5).
+    renderer='fast' использует шаблон из monitor.fast_chart (dpi и fmt png/webp),
+    'mplfinance' — исходный create_chart (PNG, dpi=120).
+    indicators — готовые массивы индикаторов (иначе TA-Lib в воркере).
+    """
+    if renderer == 'fast':
+        from monitor.fast_chart import render_fast
+        if len(ohlcv) < 2:
+            return None
+        return render_fast(symbol, timeframe, timestamps, ohlcv, dpi=dpi, fmt=fmt, indicators=indicators)
+
+    from monitor.charts import create_chart
+
+    df = pd.DataFrame(np.asarray(ohlcv), columns=['open', 'high', 'low', 'close', 'volume'])
+    df.insert(0, 'timestamp', pd.to_datetime(np.asarray(timestamps), unit='ms'))
+    buf = create_chart(df, symbol, timeframe, indicators=indicators)
+    return buf.getvalue() if buf else None
+
+
+class RenderPool:
+    """
+    Ограниченный пул процессов для рендера графиков вне event loop.
+    Воркеры запускаются заранее и уже импортировали matplotlib/mplfinance/talib.
+    Не больше max_pending задач одновременно: остальные ждут свободного места
+    (backpressure), а если места нет дольше timeout — график пропускается.
+    """
+
+    def __init__(self, workers=2, timeout=20, max_pending=None, renderer='mplfinance', dpi=120, fmt='png'):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending or workers * 4
+        self.renderer = renderer
+        self.dpi = dpi
+        self.fmt = fmt
+        self._slots = None
+        self._executor = None
+
+    def start(self):
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warmup,
+        )
+        # Поднимаем все процессы сразу, не дожидаясь первого сигнала
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+        log(f"Пул рендера графиков запущен: {self.workers} процессов")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, symbol, timeframe, timestamps, ohlcv, indicators=None):
+        """Возвращает PNG bytes или None при ошибке, таймауте или переполнении очереди."""
+        with stage_seconds.time(stage='render'):
+            return await self._render(symbol, timeframe, timestamps, ohlcv, indicators)
+
+    async def _render(self, symbol, timeframe, timestamps, ohlcv, indicators):
+        self.start()
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            log(f"Очередь рендера переполнена, график {symbol} пропущен", WARNING)
+            return None
+
+        try:
+            future = self._executor.submit(
+                render_png, symbol, timeframe, np.ascontiguousarray(timestamps), np.ascontiguousarray(ohlcv),
+                self.renderer, self.dpi, self.fmt, indicators
+            )
+        except BrokenProcessPool:
+            self._slots.release()
+            log("Пул рендера упал, перезапуск", WARNING)
+            self.close()
+            self.start()
+            return None
+        # Слот освобождается только когда воркер действительно закончил
+        slots = self._slots
+
+        def release(_):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(slots.release)
+
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            log(f"Таймаут рендера графика {symbol} ({self.timeout}с)", WARNING)
+        except BrokenProcessPool:
+            log("Пул рендера упал, перезапуск", WARNING)
+            self.close()
+            self.start()
+        except Exception as e:
+            log(f"Ошибка рендера графика {symbol}: {e}", ERROR)
+        return None
@@ -0,0 +1,75 @@
+# monitor/resample.py
+import numpy as np
+
+
+def resample(ts, ohlcv, step):
+    """
+    Векторная агрегация свечей (ts по возрастанию, ohlcv (n, 5)) в бары длиной step мс:
+    open — первый, high — максимум, low — минимум, close — последний, volume — сумма.
+    Возвращает (время открытия баров, ohlcv баров).
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    ohlcv = np.asarray(ohlcv, dtype=np.float64)
+    if not len(ts):
+        return ts, ohlcv.reshape(0, 5)
+    buckets = ts // step * step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    out = np.empty((len(starts), 5))
+    out[:, 0] = ohlcv[starts, 0]
+    out[:, 1] = np.maximum.reduceat(ohlcv[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(ohlcv[:, 2], starts)
+    out[:, 3] = ohlcv[ends, 3]
+    out[:, 4] = np.add.reduceat(ohlcv[:, 4], starts)
+    return buckets[starts], out
+
+
+class Resampler:
+    """
+    Старшие таймфреймы из буферов базового (1m) в CandleStore.
+    update() пересчитывает только бары начиная с последнего бара производного
+    буфера (он мог быть незакрытым), поэтому стоимость не зависит от длины истории.
+    Бар считается, только если базовый буфер покрывает его с начала; более старая
+    история производного таймфрейма один раз догружается с биржи (needs_backfill).
+    """
+
+    def __init__(self, store, intervals, base='1m'):
+        self.store = store
+        self.intervals = intervals
+        self.base = base
+
+    def _first_full(self, base_ts, step):
+        """Начало первого бара, целиком покрытого базовым буфером."""
+        first = int(base_ts[0])
+        return first if first % step == 0 else (first // step + 1) * step
+
+    def needs_backfill(self, symbol, timeframe):
+        """
+        Производный буфер пуст или его последний бар не покрыт базовым буфером
+        (разрыв после простоя): такие бары берутся с биржи.
+        """
+        derived = self.store.buffer(symbol, timeframe)
+        if derived.last_ts is None:
+            return True
+        base = self.store.get(symbol, self.base)
+        if base is None or not len(base):
+            return False
+        step = self.intervals[timeframe]
+        return derived.last_ts < self._first_full(base.timestamps(), step)
+
+    def update(self, symbol, timeframe):
+        """Досчитывает производный буфер из базового. Возвращает буфер или None."""
+        base = self.store.get(symbol, self.base)
+        if base is None or not len(base):
+            return self.store.get(symbol, timeframe)
+        step = self.intervals[timeframe]
+        ts = base.timestamps()
+        derived = self.store.buffer(symbol, timeframe)
+        start = self._first_full(ts, step)
+        if derived.last_ts is not None:
+            start = max(start, derived.last_ts)
+        i = int(np.searchsorted(ts, start))
+        if i == len(ts):
+            return derived
+        bar_ts, bar_ohlcv = resample(ts[i:], base.values()[i:], step)
+        return self.store.update(symbol, timeframe, bar_ts, bar_ohlcv)
@@ -0,0 +1,103 @@
+# monitor/scanner.py
+import asyncio
+from typing import NamedTuple
+import numpy as np
+from monitor.analyzer import analyze_batch, signal_info
+from monitor.buffer import store
+from monitor.fetcher import update_candles, interval_ms
+from monitor.indicators import engine
+from monitor.logger import log, is_enabled, DEBUG, WARNING, ERROR
+from monitor.metrics import stage_seconds
+
+CHART_CANDLES = 200
+
+
+class Signal(NamedTuple):
+    symbol: str
+    timeframe: str
+    frame: object   # pd.DataFrame последних window закрытых свечей
+    info: str
+    chart: tuple    # (timestamps, ohlcv, indicators) для графика
+
+
+class Scanner:
+    """
+    Загрузка свечей, расчёт старших таймфреймов и анализ набора символов.
+    В обычном режиме работает в процессе бота, в шардированном — в каждом
+    воркере на его часть тикеров (monitor.shards).
+    """
+
+    def __init__(self, limiter, resampler):
+        self.limiter = limiter
+        self.resampler = resampler
+
+    async def fetch_symbol(self, symbol, timeframe):
+        async with self.limiter:
+            try:
+                buf = await update_candles(symbol, timeframe)
+                if len(buf) < 2:
+                    log(f"[{symbol}] свечи не получены", WARNING)
+                    return False
+                return True
+            except Exception as e:
+                log(f"Ошибка {symbol}: {e}", ERROR)
+                return False
+
+    async def scan(self, symbols, timeframes, base, now, window):
+        """
+        С биржи берётся только базовый таймфрейм base; timeframes — {tf: tf_config}
+        таймфреймов, у которых закрылся новый бар. Возвращает (число символов со свечами, сигналы).
+        """
+        fetched = await asyncio.gather(*(self.fetch_symbol(symbol, base) for symbol in symbols))
+        symbols = [symbol for symbol, ok in zip(symbols, fetched) if ok]
+
+        signals = []
+        for timeframe, tf_config in timeframes.items():
+            step = interval_ms[timeframe]
+            current_open = now // step * step
+            if timeframe != base:
+                await self.derive(symbols, timeframe)
+            signals.extend(self.analyze(symbols, timeframe, tf_config, current_open, window))
+        return len(symbols), signals
+
+    async def derive(self, symbols, timeframe):
+        """Старший таймфрейм из базовых свечей; с биржи — только при холодном старте или разрыве."""
+        backfill = [symbol for symbol in symbols if self.resampler.needs_backfill(symbol, timeframe)]
+        if backfill:
+            log(f"Догрузка истории {timeframe}: {len(backfill)} тикеров")
+            await asyncio.gather(*(self.fetch_symbol(symbol, timeframe) for symbol in backfill))
+        with stage_seconds.time(stage='resample'):
+            for symbol in symbols:
+                self.resampler.update(symbol, timeframe)
+
+    def analyze(self, symbols, timeframe, tf_config, current_open, window):
+        # --- АНАЛИЗ: одним проходом по всей вселенной, только закрытые свечи ---
+        with stage_seconds.time(stage='analyze'):
+            for symbol in symbols:
+                buf = store.get(symbol, timeframe)
+                engine.update(symbol, timeframe, buf.timestamps(), buf.column('close'), until=current_open)
+            closes = store.stack(symbols, timeframe, 'close', window, until=current_open)
+            volumes = store.stack(symbols, timeframe, 'volume', window, until=current_open)
+            fired, change = analyze_batch(closes, volumes, tf_config, engine.latest(symbols, timeframe))
+
+        # Построчно «нет сигнала» — только на DEBUG; на INFO хватает итоговой строки цикла
+        if is_enabled(DEBUG):
+            fired_set = set(fired.tolist())
+            for i, symbol in enumerate(symbols):
+                if i not in fired_set:
+                    log(f"[{symbol}] {timeframe}: Условия не выполнены", DEBUG)
+
+        signals = []
+        for i in fired:
+            symbol = symbols[i]
+            try:
+                buf = store.get(symbol, timeframe)
+                # Копии: к отправке буфер уже может обновиться
+                ts, ohlcv = np.array(buf.timestamps(CHART_CANDLES)), np.array(buf.values(CHART_CANDLES))
+                chart = (ts, ohlcv, engine.series(symbol, timeframe, ts, ohlcv[:, 3]))
+                frame = buf.to_frame(window, until=current_open)
+                signals.append(Signal(symbol, timeframe, frame, signal_info(change[i]), chart))
+            except Exception as e:
+                log(f"Ошибка {symbol}: {e}", ERROR)
+        log(f"{timeframe}: обработано {len(symbols)}, сигналов {len(fired)}, без сигнала {len(symbols) - len(fired)}")
+        return signals
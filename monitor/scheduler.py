@@ -0,0 +1,104 @@
+# monitor/scheduler.py
+import asyncio
+import time
+import pytz
+from apscheduler.triggers.cron import CronTrigger
+from monitor.logger import log, WARNING
+
+# Минутный лимит веса запросов Binance FAPI на IP
+WEIGHT_BUDGET_1M = 2400
+
+candle_cron = {
+    '1m': dict(minute='*'),
+    '5m': dict(minute='*/5'),
+    '15m': dict(minute='*/15'),
+    '30m': dict(minute='*/30'),
+    '1h': dict(minute=0),
+    '4h': dict(hour='*/4', minute=0),
+}
+
+
+def candle_trigger(timeframe, offset_seconds=2, timezone=pytz.UTC):
+    """
+    Cron-триггер на закрытие свечи таймфрейма (UTC) + небольшая задержка,
+    чтобы Binance успел закрыть свечу. Зона задаётся явно: без неё CronTrigger
+    берёт локальную зону хоста, и на UTC+5:30 часовые свечи сдвигаются на 30 минут.
+    """
+    fields = candle_cron.get(timeframe, candle_cron['1m'])
+    return CronTrigger(second=offset_seconds, timezone=timezone, **fields)
+
+
+class WeightLimiter:
+    """
+    Адаптивный ограничитель параллельных запросов (async with limiter: ...).
+    По заголовку X-MBX-USED-WEIGHT-1M лимит растёт на 1, пока вес ниже low_water
+    бюджета, и уменьшается, когда выше high_water. На 429 лимит делится пополам,
+    на 418 (бан IP) сбрасывается до минимума; в обоих случаях новые запросы
+    ждут Retry-After.
+    """
+
+    def __init__(self, initial=10, min_limit=2, max_limit=40, weight_budget=WEIGHT_BUDGET_1M,
+                 low_water=0.5, high_water=0.8, adjust_interval=1.0):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.weight_budget = weight_budget
+        self.low_water = low_water
+        self.high_water = high_water
+        self.adjust_interval = adjust_interval
+        self.active = 0
+        self.used_weight = 0
+        self.paused_until = 0.0
+        self._adjusted_at = 0.0
+        self._cond = None
+
+    @property
+    def cond(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def __aenter__(self):
+        async with self.cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.active < self.limit:
+                    break
+                await self.cond.wait()
+            self.active += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+    def observe(self, status, headers):
+        """Вызывается HTTP-клиентом после каждого ответа Binance."""
+        weight = headers.get('X-MBX-USED-WEIGHT-1M')
+        if weight:
+            self.used_weight = int(weight)
+
+        now = time.monotonic()
+        if status in (429, 418):
+            retry_after = float(headers.get('Retry-After') or (60 if status == 418 else 5))
+            self.paused_until = max(self.paused_until, now + retry_after)
+            self.limit = self.min_limit if status == 418 else max(self.min_limit, self.limit // 2)
+            self._adjusted_at = now
+            log(f"Binance {status}: пауза {retry_after:.0f}с, параллельность {self.limit}", WARNING)
+            return
+
+        if now - self._adjusted_at < self.adjust_interval:
+            return
+        if self.used_weight >= self.high_water * self.weight_budget:
+            self.limit = max(self.min_limit, int(self.limit * 0.7))
+            self._adjusted_at = now
+        elif self.used_weight < self.low_water * self.weight_budget and self.limit < self.max_limit:
+            self.limit += 1
+            self._adjusted_at = now
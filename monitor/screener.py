@@ -0,0 +1,49 @@
+# monitor/screener.py
+import re
+from typing import NamedTuple
+
+EXCLUDED_KEYWORDS = ["ALPHA", "WEB3", "AI", "BOT"]
+EXCLUDED_PATTERN = re.compile("|".join(map(re.escape, EXCLUDED_KEYWORDS)), re.IGNORECASE)
+
+
+class TickerStats(NamedTuple):
+    symbol: str
+    last_price: float
+    price_change_percent: float
+    quote_volume: float
+    trades: int
+
+
+def parse_ticker_stats(data, quote_asset='USDT'):
+    """Разбирает ответ /ticker/24hr в список TickerStats для нужного quote-актива."""
+    stats = []
+    for item in data:
+        symbol = item['symbol']
+        if not symbol.endswith(quote_asset):
+            continue
+        stats.append(TickerStats(
+            symbol=symbol,
+            last_price=float(item.get('lastPrice', 0) or 0),
+            price_change_percent=float(item.get('priceChangePercent', 0) or 0),
+            quote_volume=float(item.get('quoteVolume', 0) or 0),
+            trades=int(item.get('count', 0) or 0),
+        ))
+    return stats
+
+
+def screen(stats, config):
+    """
+    Дешёвый отсев до запроса свечей по данным 24hr:
+    исключённые ключевые слова, volume_filter (оборот за 24ч в USDT)
+    и необязательные min_price_change_24h (%) и min_trades_24h.
+    """
+    min_volume = config.get('volume_filter', 0) or 0
+    min_change = config.get('min_price_change_24h', 0) or 0
+    min_trades = config.get('min_trades_24h', 0) or 0
+    return [
+        s for s in stats
+        if not EXCLUDED_PATTERN.search(s.symbol)
+        and s.quote_volume >= min_volume
+        and abs(s.price_change_percent) >= min_change
+        and s.trades >= min_trades
+    ]
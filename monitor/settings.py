@@ -1,14 +1,121 @@
+import asyncio
+import copy
 import json
+import os
+import tempfile
+from monitor.logger import log, ERROR
+from monitor.storage import default_data_dir
 
 CONFIG_FILE = "config.json"
 
-def load_config():
+def load_config(path=CONFIG_FILE):
     try:
-        with open(CONFIG_FILE,'r', encoding='utf-8') as f:
+        with open(path,'r', encoding='utf-8') as f:
             return json.load(f)
     except:
         return {}
 
-def save_config(config):
-    with open(CONFIG_FILE,'w', encoding='utf-8') as f:
-        json.dump(config,f, indent=4)
+def _write_atomic(path, text):
+    """Запись через временный файл и os.replace: файл никогда не остаётся наполовину записанным."""
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.config-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def parse_human_number(value: str) -> float:
+    """'100K', '2.5M', '1B' -> float (фильтр объёма в боте, /subscribe и бэктест)."""
+    value = value.strip().upper()
+    multiplier = 1
+    if value.endswith("K"):
+        multiplier = 1_000
+        value = value[:-1]
+    elif value.endswith("M"):
+        multiplier = 1_000_000
+        value = value[:-1]
+    elif value.endswith("B"):
+        multiplier = 1_000_000_000
+        value = value[:-1]
+    try:
+        return float(value) * multiplier
+    except ValueError:
+        raise ValueError("Неверный формат числа. Используйте: 100K, 2.5M, 1B")
+
+
+class ConfigStore(dict):
+    """
+    Конфиг в памяти (обычный dict) с отложенным сохранением: save() не пишет сразу,
+    а через delay секунд после последнего изменения, в отдельном потоке и атомарно.
+    Файл лежит на томе /data, поверх config.json из репозитория, и хранит только ключи,
+    отличающиеся от defaults: новые значения из config.json после деплоя не затеняются.
+    """
+
+    def __init__(self, path, data=None, delay=1.0, defaults=None):
+        super().__init__(data or {})
+        self.path = path
+        self.defaults = copy.deepcopy(defaults or {})
+        self.delay = delay
+        self._timer = None
+        self._task = None
+        self._dirty = False
+        self.version = 0
+
+    @classmethod
+    def load(cls, defaults_path=CONFIG_FILE, delay=1.0):
+        defaults = load_config(defaults_path)
+        root = defaults.get('data_dir') or default_data_dir()
+        path = os.path.join(root, CONFIG_FILE)
+        return cls(path, {**defaults, **load_config(path)}, delay, defaults)
+
+    def _snapshot(self):
+        changed = {k: v for k, v in self.items() if k not in self.defaults or self.defaults[k] != v}
+        return json.dumps(changed, indent=4)
+
+    def save(self):
+        self._dirty = True
+        self.version += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(self.delay, self._start_write)
+
+    def _start_write(self):
+        self._timer = None
+        previous = self._task
+        self._task = asyncio.get_running_loop().create_task(self._write(previous))
+
+    async def _write(self, previous):
+        # Записи идут строго по очереди: последняя версия всегда пишется последней
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await asyncio.to_thread(_write_atomic, self.path, self._snapshot())
+        except OSError as e:
+            log(f"Ошибка сохранения конфига {self.path}: {e}", ERROR)
+
+    def flush(self):
+        """Синхронно сохраняет изменения, ожидающие записи (при остановке)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            _write_atomic(self.path, self._snapshot())
+        except OSError as e:
+            log(f"Ошибка сохранения конфига {self.path}: {e}", ERROR)
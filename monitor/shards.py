@@ -0,0 +1,345 @@
+# monitor/shards.py
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import signal
+import time
+from bisect import bisect_right
+from typing import NamedTuple
+from monitor import fetcher, metrics
+from monitor.logger import log, set_level, set_prefix, WARNING, ERROR
+
+COMPACT_TIMEOUT = 300
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """
+    Консистентное хеширование символов по шардам: у каждого шарда replicas точек
+    на кольце, символ достаётся ближайшей точке по часовой стрелке. Когда шард
+    выпадает или возвращается, переезжают только его символы.
+    """
+
+    def __init__(self, nodes, replicas=64):
+        points = sorted((_hash(f"{node}:{i}"), node) for node in nodes for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        if not self._nodes:
+            return None
+        return self._nodes[bisect_right(self._hashes, _hash(key)) % len(self._nodes)]
+
+
+class ShardReport(NamedTuple):
+    scanned: int
+    signals: list
+    seconds: float
+    metrics: dict  # metrics.drain_shard(): стадии и счётчики API за этот скан
+
+
+class ShardHealth(NamedTuple):
+    shard: int
+    pid: int
+    up: bool
+    symbols: int
+    scanned: int
+    signals: int
+    seconds: float
+    restarts: int
+    errors: int
+    last_ok: float
+
+
+# ===== ВОРКЕР (отдельный процесс) =====
+
+def _worker_main(shard_id, conn, options):
+    # Ctrl+C получает вся группа процессов; останавливает воркеры координатор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve(shard_id, conn, options))
+
+
+async def _serve(shard_id, conn, options):
+    from monitor.buffer import store
+    from monitor.client import client
+    from monitor.indicators import engine
+    from monitor.resample import Resampler
+    from monitor.scanner import Scanner
+    from monitor.scheduler import WeightLimiter
+    from monitor.storage import DiskCandleStore
+
+    set_level(options.get('log_level', 'INFO'))
+    set_prefix(f"[шард {shard_id}] ")
+    fetcher.BINANCE_FAPI = options.get('api', fetcher.BINANCE_FAPI)
+    limiter = WeightLimiter(initial=options.get('concurrency', 10), max_limit=options.get('max_concurrency', 40))
+    client.observers.append(limiter.observe)
+    client.observers.append(metrics.observe_response)
+    if options.get('data_dir'):
+        store.disk = DiskCandleStore(options['data_dir'], max_rows=options.get('candle_store_rows', 1000))
+    scanner = Scanner(limiter, Resampler(store, fetcher.interval_ms))
+
+    async def scan(request):
+        started = time.monotonic()
+        # Чужие (переехавшие) и делистнутые символы освобождают память
+        store.retain(request['symbols'])
+        engine.retain(request['symbols'])
+        store.capacities = dict(request['capacities'])
+        store.max_series = request['max_series']
+        scanner.resampler.base = request['base']
+        scanned, signals = await scanner.scan(
+            request['symbols'], request['timeframes'], request['base'], request['now'], request['window'])
+        return ShardReport(scanned, signals, time.monotonic() - started, metrics.drain_shard())
+
+    def compact_own(keys):
+        compacted = 0
+        for symbol, timeframe in keys:
+            if not os.path.exists(store.disk.path(symbol, timeframe)):
+                continue
+            try:
+                store.disk.compact(symbol, timeframe)
+                compacted += 1
+            except Exception as e:
+                log(f"Ошибка сжатия {timeframe}/{symbol}: {e}", ERROR)
+        return compacted
+
+    async def compact(request):
+        if store.disk is None:
+            return 0
+        return await asyncio.to_thread(compact_own, store.keys())
+
+    handlers = {'scan': scan, 'compact': compact}
+    await client.start()
+    try:
+        while True:
+            try:
+                command, request = await asyncio.to_thread(conn.recv)
+            except (EOFError, OSError):
+                break  # координатор завершился
+            if command == 'stop':
+                break
+            try:
+                reply = ('ok', await handlers[command](request))
+            except Exception as e:
+                log(f"Ошибка команды {command}: {e}", ERROR)
+                reply = ('error', f"{type(e).__name__}: {e}")
+            conn.send(reply)
+    finally:
+        await client.close()
+        conn.close()
+
+
+# ===== КООРДИНАТОР (процесс бота) =====
+
+class Shard:
+    """Процесс-воркер и его состояние со стороны координатора."""
+
+    def __init__(self, shard_id):
+        self.id = shard_id
+        self.process = None
+        self.conn = None
+        self.symbols = 0
+        self.scanned = 0
+        self.signals = 0
+        self.seconds = None
+        self.restarts = 0
+        self.errors = 0
+        self.failures = 0
+        self.last_ok = None
+        self.disabled_until = 0.0
+        self._lock = None
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, options):
+        ctx = multiprocessing.get_context('spawn')
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(self.id, child, {'api': fetcher.BINANCE_FAPI, **options}),
+            name=f"shard-{self.id}", daemon=True,
+        )
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join(1)
+        if self.conn is not None:
+            self.conn.close()
+        self.process = self.conn = None
+
+    async def request(self, command, payload, timeout):
+        # Один запрос в Pipe за раз: сжатие и скан не перемешивают ответы
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self.conn.send((command, payload))
+            status, result = await asyncio.wait_for(asyncio.to_thread(self.conn.recv), timeout)
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+
+class ShardCoordinator:
+    """
+    Шардированное сканирование на несколько ядер: тикеры делятся между workers
+    процессами консистентным хешированием, каждый воркер держит буферы свечей и
+    индикаторы своих тикеров, сам качает и анализирует их и возвращает сигналы по Pipe.
+    Telegram, планировщик, кулдауны и подписчики остаются в процессе бота.
+    Упавший или зависший воркер перезапускается; после max_failures неудач подряд
+    шард на retry_after секунд выводится из кольца и его тикеры берут остальные.
+    """
+
+    def __init__(self, workers, options=None, timeout=50, max_failures=3, retry_after=300):
+        self.shards = [Shard(i) for i in range(workers)]
+        self.options = options or {}
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.retry_after = retry_after
+        self.assignment = {}
+        self._ring = None
+        self._ring_nodes = None
+
+    def __len__(self):
+        return len(self.shards)
+
+    def start(self):
+        for shard in self.shards:
+            if not shard.alive:
+                shard.start(self.options)
+        log(f"Шарды сканирования запущены: {len(self.shards)} процессов")
+
+    async def stop(self):
+        for shard in self.shards:
+            if shard.alive:
+                try:
+                    shard.conn.send(('stop', None))
+                except OSError:
+                    pass
+
+        def join():
+            for shard in self.shards:
+                if shard.process is not None:
+                    shard.process.join(5)
+                shard.kill()
+
+        await asyncio.to_thread(join)
+
+    def _available(self):
+        """Шарды, которым можно дать работу; упавшие процессы перезапускаются."""
+        now = time.monotonic()
+        ready = []
+        for shard in self.shards:
+            if shard.disabled_until > now:
+                continue
+            if not shard.alive:
+                if shard.process is not None:
+                    log(f"Шард {shard.id} упал (код {shard.process.exitcode}), перезапуск", WARNING)
+                    shard.restarts += 1
+                shard.kill()
+                shard.start(self.options)
+            ready.append(shard)
+        return ready
+
+    def rebalance(self, symbols, shards):
+        """Раскладывает символы по шардам; листинги, делистинги и переезды пишутся в лог."""
+        nodes = tuple(shard.id for shard in shards)
+        if nodes != self._ring_nodes:
+            self._ring, self._ring_nodes = HashRing(nodes), nodes
+        assignment = {symbol: self._ring.node(symbol) for symbol in symbols}
+        listed = len(assignment.keys() - self.assignment.keys())
+        delisted = len(self.assignment.keys() - assignment.keys())
+        moved = sum(1 for symbol, node in assignment.items()
+                    if symbol in self.assignment and self.assignment[symbol] != node)
+        if self.assignment and (listed or delisted or moved):
+            log(f"Ребалансировка шардов: новых {listed}, удалено {delisted}, переехало {moved}")
+        self.assignment = assignment
+
+        groups = {node: [] for node in nodes}
+        for symbol, node in assignment.items():
+            groups[node].append(symbol)
+        return groups
+
+    async def scan(self, symbols, timeframes, base, now, window, capacities=None, max_series=3000):
+        """Тот же контракт, что у Scanner.scan, но по всем шардам параллельно."""
+        shards = self._available()
+        if not shards:
+            log("Нет доступных шардов, цикл пропущен", ERROR)
+            return 0, []
+        groups = self.rebalance(symbols, shards)
+        for shard in self.shards:
+            if shard.id not in groups:
+                shard.symbols = 0
+                metrics.shard_symbols.set(0, shard=shard.id)
+        request = dict(timeframes=timeframes, base=base, now=now, window=window,
+                       capacities=dict(capacities or {}), max_series=max_series)
+        reports = await asyncio.gather(*(
+            self._scan_shard(shard, {**request, 'symbols': groups[shard.id]}) for shard in shards))
+        reports = [report for report in reports if report is not None]
+        metrics.merge_shards(report.metrics for report in reports)
+        return sum(r.scanned for r in reports), [s for r in reports for s in r.signals]
+
+    async def _scan_shard(self, shard, request):
+        shard.symbols = len(request['symbols'])
+        metrics.shard_symbols.set(shard.symbols, shard=shard.id)
+        try:
+            report = await shard.request('scan', request, self.timeout)
+        except Exception as e:
+            self._fail(shard, e)
+            return None
+        shard.failures = 0
+        shard.last_ok = time.time()
+        shard.scanned, shard.signals, shard.seconds = report.scanned, len(report.signals), report.seconds
+        metrics.shard_up.set(1, shard=shard.id)
+        metrics.shard_scan_seconds.set(report.seconds, shard=shard.id)
+        return report
+
+    def _fail(self, shard, error):
+        shard.errors += 1
+        shard.failures += 1
+        shard.restarts += 1
+        metrics.shard_up.set(0, shard=shard.id)
+        metrics.shard_restarts_total.inc(shard=shard.id)
+        reason = str(error) or type(error).__name__
+        shard.kill()
+        if shard.failures >= self.max_failures:
+            shard.disabled_until = time.monotonic() + self.retry_after
+            log(f"Шард {shard.id}: {reason}; отключён на {self.retry_after}с, тикеры переходят к другим", ERROR)
+        else:
+            log(f"Шард {shard.id}: {reason}; перезапуск", ERROR)
+            shard.start(self.options)
+
+    async def compact(self):
+        """Каждый воркер сжимает файлы своих тикеров (координатор их не трогает)."""
+        shards = [shard for shard in self.shards if shard.alive]
+        results = await asyncio.gather(
+            *(shard.request('compact', None, COMPACT_TIMEOUT) for shard in shards), return_exceptions=True)
+        for shard, result in zip(shards, results):
+            if isinstance(result, Exception):
+                log(f"Шард {shard.id}: ошибка сжатия: {result}", ERROR)
+        return sum(result for result in results if isinstance(result, int))
+
+    def health(self):
+        return [
+            ShardHealth(shard.id, shard.process.pid if shard.alive else None, shard.alive,
+                        shard.symbols, shard.scanned, shard.signals, shard.seconds,
+                        shard.restarts, shard.errors, shard.last_ok)
+            for shard in self.shards
+        ]
+
+    def summary(self):
+        """Короткая сводка по шардам для ответа Status в боте."""
+        lines = []
+        for h in self.health():
+            state = 'работает' if h.up else 'не работает'
+            seconds = '—' if h.seconds is None else f"{h.seconds:.1f}с"
+            ago = '—' if h.last_ok is None else f"{time.time() - h.last_ok:.0f}с назад"
+            lines.append(f"Шард {h.shard}: {state}, тикеров {h.symbols}, скан {seconds}, "
+                         f"успех {ago}, перезапусков {h.restarts}")
+        return '\n'.join(lines)
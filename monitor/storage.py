@@ -0,0 +1,124 @@
+# monitor/storage.py
+import os
+import threading
+import numpy as np
+from monitor.logger import log, ERROR
+
+CANDLE_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+
+def ohlcv_view(rows):
+    """Колонки open..volume массива CANDLE_DTYPE как (n, 5) float64 без копирования."""
+    rows = np.ascontiguousarray(rows)
+    return rows.view(np.float64).reshape(len(rows), len(CANDLE_DTYPE))[:, 1:]
+
+
+def to_records(ts, ohlcv):
+    rows = np.empty(len(ts), dtype=CANDLE_DTYPE)
+    rows['timestamp'] = ts
+    for i, name in enumerate(CANDLE_DTYPE.names[1:]):
+        rows[name] = ohlcv[:, i]
+    return rows
+
+
+def dedupe(rows):
+    """Сортирует по времени и оставляет последнюю запись для каждой свечи."""
+    if not len(rows):
+        return rows
+    reversed_ts = rows['timestamp'][::-1]
+    _, first = np.unique(reversed_ts, return_index=True)
+    return rows[len(rows) - 1 - first]
+
+
+def default_data_dir():
+    return '/data' if os.access('/data', os.W_OK) else 'data'
+
+
+class DiskCandleStore:
+    """
+    Колоночное хранилище свечей на диске (том /data на Amvera):
+    <root>/candles/<timeframe>/<SYMBOL>.bin — append-only записи CANDLE_DTYPE.
+    Незакрытая свеча просто дописывается ещё раз, при чтении берётся последняя
+    версия; compact() периодически убирает дубли и обрезает файл до max_rows.
+    Чтение идёт через np.memmap, поэтому загружаются только нужные хвосты.
+    """
+
+    def __init__(self, root, max_rows=1000):
+        self.root = os.path.join(root, 'candles')
+        self.max_rows = max_rows
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, timeframe, f"{symbol}.bin")
+
+    def _lock(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _read(self, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        # Обрыв записи при падении процесса: хвост неполной записи игнорируется
+        count = size // CANDLE_DTYPE.itemsize
+        if not count:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r', shape=(count,))
+
+    def load(self, symbol, timeframe, n=None):
+        """Последние n свечей (копия, без дублей, по возрастанию времени)."""
+        path = self.path(symbol, timeframe)
+        with self._lock(path):
+            rows = self._read(path)
+            # Дубли бывают только у недавних свечей, поэтому хватает хвоста с запасом
+            tail = rows if n is None else rows[-(n * 4):]
+            rows = dedupe(np.array(tail))
+        return rows if n is None else rows[-n:]
+
+    def append(self, symbol, timeframe, ts, ohlcv):
+        if not len(ts):
+            return
+        path = self.path(symbol, timeframe)
+        rows = to_records(ts, ohlcv)
+        with self._lock(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as f:
+                f.write(rows.tobytes())
+
+    def compact(self, symbol, timeframe):
+        path = self.path(symbol, timeframe)
+        with self._lock(path):
+            rows = dedupe(np.array(self._read(path)))
+            if self.max_rows:
+                rows = rows[-self.max_rows:]
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(rows.tobytes())
+            os.replace(tmp, path)
+
+    def compact_all(self):
+        """Сжимает все файлы; вызывать из потока, не из event loop."""
+        compacted = 0
+        if not os.path.isdir(self.root):
+            return compacted
+        for timeframe in os.listdir(self.root):
+            folder = os.path.join(self.root, timeframe)
+            for name in os.listdir(folder):
+                if not name.endswith('.bin'):
+                    continue
+                try:
+                    self.compact(name[:-4], timeframe)
+                    compacted += 1
+                except Exception as e:
+                    log(f"Ошибка сжатия {timeframe}/{name}: {e}", ERROR)
+        log(f"Хранилище свечей сжато: {compacted} файлов")
+        return compacted
@@ -0,0 +1,112 @@
+# monitor/stream.py
+import asyncio
+import aiohttp
+from monitor.buffer import store
+from monitor.client import client
+from monitor.fetcher import update_candles
+from monitor.logger import log, WARNING, ERROR
+from monitor.parser import loads
+
+BINANCE_FSTREAM = "wss://fstream.binance.com/stream"
+
+
+class KlineStream:
+    """
+    Потоковый режим: подписка на комбинированные потоки <symbol>@kline_<tf>,
+    разбитые на несколько WebSocket-соединений (шардов).
+    При каждом (пере)подключении шард догружает историю через REST в общий
+    буфер свечей, а on_close(symbol, df) вызывается сразу после закрытия свечи.
+    """
+
+    def __init__(self, symbols, timeframe, on_close, shard_size=150, history=100,
+                 backfill_concurrency=10, reconnect_delay=1, max_reconnect_delay=60):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.on_close = on_close
+        self.shard_size = shard_size
+        self.history = history
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._backfill_semaphore = asyncio.Semaphore(backfill_concurrency)
+        self._tasks = []
+        self._callbacks = set()
+
+    @property
+    def shards(self):
+        return [self.symbols[i:i + self.shard_size] for i in range(0, len(self.symbols), self.shard_size)]
+
+    @property
+    def running(self):
+        return any(not t.done() for t in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run_shard(n, shard))
+            for n, shard in enumerate(self.shards)
+        ]
+        log(f"Стрим запущен: {len(self.symbols)} тикеров, шардов: {len(self._tasks)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        log("Стрим остановлен")
+
+    def _url(self, shard):
+        streams = "/".join(f"{s.lower()}@kline_{self.timeframe}" for s in shard)
+        return f"{BINANCE_FSTREAM}?streams={streams}"
+
+    async def _run_shard(self, n, shard):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with client.session.ws_connect(self._url(shard), heartbeat=30) as ws:
+                    log(f"Стрим шард {n}: подключено ({len(shard)} тикеров)")
+                    # Сообщения копятся в буфере сокета, пока идёт догрузка
+                    await self._backfill(shard)
+                    delay = self.reconnect_delay
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._handle(msg.json(loads=loads))
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+                log(f"Стрим шард {n}: соединение закрыто")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log(f"Стрим шард {n}: ошибка {e}", WARNING)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _backfill(self, shard):
+        async def load(symbol):
+            # Последняя свеча из REST ещё не закрыта — поток перезапишет её при закрытии
+            async with self._backfill_semaphore:
+                try:
+                    await update_candles(symbol, self.timeframe)
+                except Exception as e:
+                    log(f"Ошибка догрузки {symbol}: {e}", ERROR)
+
+        await asyncio.gather(*(load(symbol) for symbol in shard))
+
+    def _handle(self, payload):
+        data = payload.get('data', payload)
+        if data.get('e') != 'kline':
+            return
+        k = data['k']
+        if not k.get('x'):
+            return
+
+        symbol = data['s']
+        buf = store.buffer(symbol, self.timeframe)
+        if buf.last_ts is not None and k['t'] < buf.last_ts:
+            return
+        ohlcv = [[float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]]
+        df = store.update(symbol, self.timeframe, [k['t']], ohlcv).to_frame(self.history)
+
+        task = asyncio.create_task(self.on_close(symbol, df))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
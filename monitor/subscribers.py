@@ -0,0 +1,105 @@
+# monitor/subscribers.py
+import os
+from bisect import bisect_right
+from typing import NamedTuple
+import numpy as np
+from monitor.settings import ConfigStore, load_config
+
+SUBSCRIBERS_FILE = "subscribers.json"
+
+
+class Subscriber(NamedTuple):
+    chat_id: str
+    timeframe: str
+    volume_filter: float = 0.0
+    change_threshold: float = 0.0
+
+
+class SubscriberIndex:
+    """
+    Индекс подписчиков для подбора получателей сигнала: по каждому таймфрейму
+    подписчики отсортированы по порогу изменения, поэтому подходящие по порогу —
+    префикс, найденный bisect; объём (оборот 24ч) проверяется векторно по префиксу.
+    """
+
+    def __init__(self, subscribers):
+        grouped = {}
+        for sub in subscribers:
+            grouped.setdefault(sub.timeframe, []).append(sub)
+        self._index = {}
+        for timeframe, subs in grouped.items():
+            subs.sort(key=lambda s: s.change_threshold)
+            self._index[timeframe] = (
+                [s.change_threshold for s in subs],
+                np.array([s.volume_filter for s in subs], dtype=np.float64),
+                [s.chat_id for s in subs],
+            )
+
+    def __len__(self):
+        return sum(len(chats) for _, _, chats in self._index.values())
+
+    def timeframes(self):
+        """{tf: минимальный порог изменения} — с ним и нужно сканировать таймфрейм."""
+        return {tf: thresholds[0] for tf, (thresholds, _, _) in self._index.items()}
+
+    def min_volume(self):
+        """Минимальный volume_filter среди всех подписчиков (для общего отсева тикеров)."""
+        volumes = [volumes.min() for _, volumes, _ in self._index.values()]
+        return float(min(volumes)) if volumes else 0.0
+
+    def match(self, timeframe, change, quote_volume):
+        """chat_id подписчиков, чьи порог (|change|, %) и фильтр объёма пройдены."""
+        entry = self._index.get(timeframe)
+        if entry is None:
+            return []
+        thresholds, volumes, chats = entry
+        k = bisect_right(thresholds, abs(change))
+        chosen = np.flatnonzero(volumes[:k] <= quote_volume)
+        return list(dict.fromkeys(chats[i] for i in chosen))
+
+
+class SubscriberRegistry:
+    """Подписки (chat_id, timeframe) с сохранением в <data_dir>/subscribers.json."""
+
+    def __init__(self, store):
+        self._store = store
+        self._store.setdefault('subscribers', [])
+        self.version = 0
+
+    @classmethod
+    def load(cls, root):
+        path = os.path.join(root, SUBSCRIBERS_FILE)
+        return cls(ConfigStore(path, load_config(path)))
+
+    def __len__(self):
+        return len(self._store['subscribers'])
+
+    def all(self):
+        return [Subscriber(**row) for row in self._store['subscribers']]
+
+    def for_chat(self, chat_id):
+        return [s for s in self.all() if s.chat_id == str(chat_id)]
+
+    def add(self, sub):
+        """Добавляет или заменяет подписку чата на таймфрейм."""
+        sub = sub._replace(chat_id=str(sub.chat_id))
+        rows = [r for r in self._store['subscribers']
+                if (r['chat_id'], r['timeframe']) != (sub.chat_id, sub.timeframe)]
+        rows.append(sub._asdict())
+        self._commit(rows)
+
+    def remove(self, chat_id, timeframe=None):
+        """Удаляет подписки чата (все или на один таймфрейм). Возвращает их количество."""
+        rows = self._store['subscribers']
+        keep = [r for r in rows
+                if r['chat_id'] != str(chat_id) or (timeframe is not None and r['timeframe'] != timeframe)]
+        self._commit(keep)
+        return len(rows) - len(keep)
+
+    def _commit(self, rows):
+        self._store['subscribers'] = rows
+        self._store.save()
+        self.version += 1
+
+    def flush(self):
+        self._store.flush()
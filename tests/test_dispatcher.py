@@ -0,0 +1,111 @@
+# tests/test_dispatcher.py
+"""SignalDispatcher с подменённым Telegram-ботом."""
+import asyncio
+import time
+
+from telegram.error import ChatMigrated, NetworkError, RetryAfter
+
+from monitor.dispatcher import SignalDispatcher
+
+
+class FakeBot:
+    """Первая отправка в limited отвечает RetryAfter(retry_after), остальные проходят."""
+
+    def __init__(self, limited, retry_after=1):
+        self.limited = limited
+        self.retry_after = retry_after
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == self.limited and self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise RetryAfter(retry_after)
+        self.sent.append((chat_id, text, time.monotonic()))
+
+    async def send_photo(self, chat_id, photo, caption, **kwargs):
+        await self.send_message(chat_id, caption)
+
+
+def test_retry_after_does_not_block_other_chats():
+    async def main():
+        bot = FakeBot('slow')
+        dispatcher = SignalDispatcher(bot, chat_interval=0, global_rate=1000, merge_limit=1)
+        started = time.monotonic()
+        dispatcher.submit('slow', 'first')
+        dispatcher.submit('slow', 'second')
+        dispatcher.submit('fast', 'other')
+        dispatcher.start()
+        await dispatcher.stop(timeout=5)
+        return bot.sent, started, dispatcher
+
+    sent, started, dispatcher = asyncio.run(main())
+    fast = [at for chat_id, _, at in sent if chat_id == 'fast']
+    assert fast and fast[0] - started < 0.5
+    # Пачка вернулась в начало очереди чата: порядок сигналов сохранён
+    assert [text for chat_id, text, _ in sent if chat_id == 'slow'] == ['first', 'second']
+    assert min(at for chat_id, _, at in sent if chat_id == 'slow') - started >= 1
+    assert dispatcher.sent == 3 and dispatcher.dropped == 0
+
+
+def test_retry_after_gives_up_after_max_retries():
+    async def main():
+        bot = FakeBot('slow')
+        dispatcher = SignalDispatcher(bot, chat_interval=0, global_rate=1000, max_retries=2)
+
+        async def always_limited(chat_id, text, **kwargs):
+            raise RetryAfter(0.01)
+
+        bot.send_message = always_limited
+        dispatcher.submit('slow', 'never')
+        dispatcher.start()
+        await dispatcher.stop(timeout=2)
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert dispatcher.sent == 0 and dispatcher.dropped == 1 and len(dispatcher) == 0
+
+
+def test_network_error_does_not_block_other_chats():
+    async def main():
+        bot = FakeBot('broken', retry_after=0)
+        dispatcher = SignalDispatcher(bot, chat_interval=0, global_rate=1000, max_retries=3)
+        send_message = bot.send_message
+
+        async def flaky(chat_id, text, **kwargs):
+            if chat_id == 'broken':
+                raise NetworkError("Connection reset")
+            await send_message(chat_id, text, **kwargs)
+
+        bot.send_message = flaky
+        started = time.monotonic()
+        dispatcher.submit('broken', 'lost')
+        dispatcher.start()
+        await asyncio.sleep(0.05)
+        dispatcher.submit('fast', 'other')
+        await asyncio.sleep(0.2)
+        await dispatcher.stop(timeout=0)
+        return bot.sent, started, dispatcher
+
+    sent, started, dispatcher = asyncio.run(main())
+    # Повтор для broken ждёт backoff в очереди, а не в цикле отправки
+    assert [(chat_id, text) for chat_id, text, _ in sent] == [('fast', 'other')]
+    assert sent[0][2] - started < 0.2
+    assert dispatcher.sent == 1 and len(dispatcher) == 1
+
+
+def test_chat_migrated_is_terminal():
+    async def main():
+        bot = FakeBot('old', retry_after=0)
+
+        async def migrated(chat_id, text, **kwargs):
+            raise ChatMigrated(-100123)
+
+        bot.send_message = migrated
+        dispatcher = SignalDispatcher(bot, chat_interval=0, global_rate=1000)
+        dispatcher.submit('old', 'signal')
+        dispatcher.start()
+        await dispatcher.stop(timeout=1)
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert dispatcher.sent == 0 and dispatcher.dropped == 1 and len(dispatcher) == 0
@@ -0,0 +1,83 @@
+# tests/test_indicators.py
+"""Потоковые индикаторы против TA-Lib на той же последовательности свечей, включая NaN-разгон."""
+import numpy as np
+import pytest
+
+talib = pytest.importorskip('talib')
+
+from monitor.indicators import EMA, INDICATOR_COLUMNS, RSI, IndicatorEngine
+
+STEP = 60_000
+BARS = 150
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(7)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, BARS)))
+    timestamps = 1_700_000_000_000 + STEP * np.arange(BARS, dtype=np.int64)
+    return timestamps, closes
+
+
+def reference(closes):
+    """Колонки INDICATOR_COLUMNS, посчитанные TA-Lib по всей серии."""
+    macd, signal, hist = talib.MACD(closes, fastperiod=12, slowperiod=26, signalperiod=9)
+    rsi = talib.RSI(closes, timeperiod=14)
+    upper, middle, lower = talib.BBANDS(closes, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+    return np.column_stack([macd, signal, hist, rsi, middle, upper, lower])
+
+
+def assert_matches(actual, expected):
+    for j, name in enumerate(INDICATOR_COLUMNS):
+        # NaN-префикс (разгон) тот же, что у TA-Lib, значения — до ошибок округления
+        np.testing.assert_array_equal(np.isnan(actual[:, j]), np.isnan(expected[:, j]), err_msg=name)
+        np.testing.assert_allclose(actual[:, j], expected[:, j], rtol=1e-9, atol=1e-9, equal_nan=True,
+                                   err_msg=name)
+
+
+@pytest.mark.parametrize('period', [9, 12, 26])
+def test_ema(candles, period):
+    _, closes = candles
+    ema = EMA(period)
+    actual = np.array([ema.update(x) for x in closes])
+    np.testing.assert_allclose(actual, talib.EMA(closes, timeperiod=period), rtol=1e-12, equal_nan=True)
+
+
+def test_rsi(candles):
+    _, closes = candles
+    rsi = RSI(14)
+    actual = np.array([rsi.update(x) for x in closes])
+    np.testing.assert_allclose(actual, talib.RSI(closes, timeperiod=14), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_closed_bars_one_at_a_time(candles):
+    timestamps, closes = candles
+    engine = IndicatorEngine(capacity=BARS)
+    for i in range(1, BARS + 1):
+        engine.update('BTCUSDT', '1m', timestamps[:i], closes[:i])
+    state = engine._states[('BTCUSDT', '1m')]
+    np.testing.assert_array_equal(state.history.timestamps(), timestamps)
+    assert_matches(state.history.values(), reference(closes))
+
+    latest = engine.latest(['BTCUSDT', 'ETHUSDT'], '1m')
+    expected = reference(closes)[-1]
+    for j, name in enumerate(INDICATOR_COLUMNS):
+        assert latest[name][0] == pytest.approx(expected[j], rel=1e-9)
+        assert np.isnan(latest[name][1])
+
+
+def test_peek_matches_talib_without_changing_state(candles):
+    timestamps, closes = candles
+    engine = IndicatorEngine(capacity=BARS)
+    peeked = np.full((BARS, len(INDICATOR_COLUMNS)), np.nan)
+    for i in range(1, BARS):
+        # Свечи 0..i-1 закрыты, свеча i ещё формируется (until — её время открытия)
+        state = engine.update('BTCUSDT', '1m', timestamps[:i + 1], closes[:i + 1], until=timestamps[i])
+        before = state.history.values().copy()
+        series = engine.series('BTCUSDT', '1m', timestamps[:i + 1], closes[:i + 1])
+        peeked[i] = [series[name][-1] for name in INDICATOR_COLUMNS]
+        assert state.last_ts == timestamps[i - 1]
+        np.testing.assert_array_equal(state.history.values(), before)
+
+    # Строка 0 — NaN у обоих: у движка нет закрытой истории, у TA-Lib идёт разгон
+    assert_matches(peeked, reference(closes))
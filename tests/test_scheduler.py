@@ -0,0 +1,35 @@
+# tests/test_scheduler.py
+"""candle_trigger срабатывает на закрытии свечи по UTC независимо от зоны хоста."""
+import os
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+from monitor.scheduler import candle_trigger
+
+
+@pytest.fixture
+def kolkata_tz():
+    saved = os.environ.get('TZ')
+    os.environ['TZ'] = 'Asia/Kolkata'
+    time.tzset()
+    yield
+    if saved is None:
+        os.environ.pop('TZ')
+    else:
+        os.environ['TZ'] = saved
+    time.tzset()
+
+
+@pytest.mark.parametrize('timeframe, expected', [
+    ('1m', datetime(2024, 1, 1, 1, 2, 2)),
+    ('15m', datetime(2024, 1, 1, 1, 15, 2)),
+    ('1h', datetime(2024, 1, 1, 2, 0, 2)),
+    ('4h', datetime(2024, 1, 1, 4, 0, 2)),
+])
+def test_next_fire_time_is_utc_candle_close(kolkata_tz, timeframe, expected):
+    now = pytz.UTC.localize(datetime(2024, 1, 1, 1, 1, 30))
+    fire = candle_trigger(timeframe).get_next_fire_time(None, now)
+    assert fire.astimezone(pytz.UTC).replace(tzinfo=None) == expected
@@ -0,0 +1,146 @@
+# tests/test_stream.py
+"""KlineStream против локальной замены Binance: aiohttp-сервер с /fapi/v1/klines и /stream."""
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from monitor import fetcher, stream as stream_module
+from monitor.buffer import store
+from monitor.client import client
+from monitor.stream import KlineStream
+
+STEP = 60_000
+FORMING = 1_700_000_040_000  # открытие незакрытой свечи на момент догрузки
+
+
+def kline_message(symbol, t, close, closed=True):
+    return {"stream": f"{symbol.lower()}@kline_1m", "data": {
+        "e": "kline", "E": t + STEP, "s": symbol,
+        "k": {"t": t, "T": t + STEP - 1, "s": symbol, "i": "1m",
+              "o": "1", "h": "2", "l": "0.5", "c": str(close), "v": "10", "x": closed},
+    }}
+
+
+class StandIn:
+    """Отдаёт три свечи 1m (последняя — FORMING) и после подключения шлёт messages."""
+
+    def __init__(self, messages=(), refuse=0):
+        self.messages = list(messages)
+        self.refuse = refuse
+        self.connects = []
+        self.kline_requests = []
+
+    async def klines(self, request):
+        self.kline_requests.append(dict(request.query))
+        return web.json_response([[FORMING - STEP * i, "1", "2", "0.5", "1", "10"] for i in (2, 1, 0)])
+
+    async def stream(self, request):
+        self.connects.append(time.monotonic())
+        if len(self.connects) <= self.refuse:
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for message in self.messages:
+            await ws.send_str(json.dumps(message))
+        async for _ in ws:
+            pass
+        return ws
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/fapi/v1/klines', self.klines)
+        app.router.add_get('/stream', self.stream)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self._saved = fetcher.BINANCE_FAPI, stream_module.BINANCE_FSTREAM
+        fetcher.BINANCE_FAPI = f"http://127.0.0.1:{port}/fapi/v1"
+        stream_module.BINANCE_FSTREAM = f"ws://127.0.0.1:{port}/stream"
+        return self
+
+    async def __aexit__(self, *exc):
+        fetcher.BINANCE_FAPI, stream_module.BINANCE_FSTREAM = self._saved
+        await client.close()
+        await self._runner.cleanup()
+        store.retain([])
+
+
+async def until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "не дождались"
+        await asyncio.sleep(0.01)
+
+
+def run_stream(server, symbols, settle=0.2, **kwargs):
+    """Запускает стрим, ждёт settle секунд после первой догрузки; возвращает (server, вызовы on_close)."""
+    closed = []
+
+    async def on_close(symbol, df):
+        closed.append((symbol, int(df['timestamp'].iloc[-1].value // 1_000_000), float(df['close'].iloc[-1])))
+
+    async def scenario():
+        async with server:
+            stream = KlineStream(symbols, '1m', on_close, **kwargs)
+            await stream.start()
+            try:
+                await until(lambda: len(server.kline_requests) >= len(symbols))
+                await asyncio.sleep(settle)
+            finally:
+                await stream.stop()
+        return server, closed
+
+    return asyncio.run(scenario())
+
+
+def test_backfill_on_connect():
+    server, _ = run_stream(StandIn(), ['AAAUSDT', 'BBBUSDT'], settle=0)
+    assert sorted(q['symbol'] for q in server.kline_requests) == ['AAAUSDT', 'BBBUSDT']
+    assert all(q['interval'] == '1m' for q in server.kline_requests)
+
+
+def test_backfill_fills_buffer():
+    async def scenario():
+        async with StandIn() as server:
+            stream = KlineStream(['AAAUSDT'], '1m', lambda *a: asyncio.sleep(0))
+            await stream.start()
+            await until(lambda: store.get('AAAUSDT', '1m') is not None and len(store.get('AAAUSDT', '1m')) == 3)
+            assert store.get('AAAUSDT', '1m').last_ts == FORMING
+            await stream.stop()
+            return server
+
+    asyncio.run(scenario())
+
+
+def test_on_close_only_for_closed_klines():
+    server, closed = run_stream(StandIn([
+        kline_message('AAAUSDT', FORMING, 5, closed=False),
+        kline_message('AAAUSDT', FORMING, 7, closed=True),
+        kline_message('AAAUSDT', FORMING + STEP, 8, closed=False),
+    ]), ['AAAUSDT'])
+    assert closed == [('AAAUSDT', FORMING, 7.0)]
+
+
+def test_stale_klines_ignored():
+    server, closed = run_stream(StandIn([
+        kline_message('AAAUSDT', FORMING - 2 * STEP, 3),
+        kline_message('AAAUSDT', FORMING, 7),
+        kline_message('AAAUSDT', FORMING - STEP, 4),
+    ]), ['AAAUSDT'])
+    assert closed == [('AAAUSDT', FORMING, 7.0)]
+
+
+def test_reconnect_with_backoff():
+    server, _ = run_stream(StandIn(refuse=3), ['AAAUSDT'], settle=0,
+                           reconnect_delay=0.05, max_reconnect_delay=0.15)
+    assert len(server.connects) == 4
+    gaps = [b - a for a, b in zip(server.connects, server.connects[1:])]
+    # 0.05 -> 0.1 -> 0.15 (потолок max_reconnect_delay)
+    assert gaps[0] >= 0.05 and gaps[1] >= 0.1 and gaps[2] >= 0.15
+    assert gaps[1] > gaps[0] * 1.5
+    # Догрузка — при каждом успешном подключении, не на отказах
+    assert len(server.kline_requests) == 1